@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from api.renderers import PDFShoppingListRenderer, RendererUnavailable
+        try:
+            PDFShoppingListRenderer().prepare()
+        except RendererUnavailable:
+            # Ошибка уже в логе, остальные форматы списка покупок работают.
+            pass
@@ -0,0 +1,136 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from rest_framework import status
+from rest_framework.response import Response
+
+from api.serializers import BulkIdsSerializer
+from core import idempotency
+from core.cache import bump_version_on_commit
+from core.constants import USER_VERSION
+from recipes.models import Cart, Recipe, ShoppingCartItem, lock_recipes
+from users.models import Subscription
+
+User = get_user_model()
+
+CREATED = 'created'
+DELETED = 'deleted'
+EXISTS = 'exists'
+MISSING = 'missing'
+NOT_FOUND = 'not_found'
+SELF = 'self'
+
+
+def lock_user(user):
+    """
+    Блокирует строку пользователя до конца транзакции.
+
+    Параллельные изменения коллекций одного пользователя выполняются по
+    очереди, поэтому проверка наличия не гонится с созданием.
+    """
+    list(User.objects.select_for_update().filter(
+        pk=user.pk
+    ).values_list('pk', flat=True))
+
+
+def change_recipes(user, ids, adding, model):
+    """Добавляет или удаляет рецепты из избранного или списка покупок."""
+    found = set(Recipe.objects.filter(id__in=ids).values_list('id', flat=True))
+    current = set(model.objects.filter(
+        user=user, recipe_id__in=found
+    ).values_list('recipe_id', flat=True))
+    if adding:
+        new = found - current
+        changed = [recipe_id for recipe_id in ids if recipe_id in new]
+        model.objects.bulk_create(
+            (model(user=user, recipe_id=recipe_id) for recipe_id in changed),
+            ignore_conflicts=True
+        )
+        statuses = (CREATED, EXISTS)
+    else:
+        changed = [recipe_id for recipe_id in ids if recipe_id in current]
+        model.objects.filter(user=user, recipe_id__in=changed).delete()
+        statuses = (DELETED, MISSING)
+    if changed and model is Cart:
+        if adding:
+            ShoppingCartItem.objects.add_recipes(user, changed)
+        else:
+            ShoppingCartItem.objects.remove_recipes(user, changed)
+    if changed:
+        bump_version_on_commit(USER_VERSION.format(user.id))
+    changed = set(changed)
+    return [
+        {
+            'id': recipe_id,
+            'status': (
+                NOT_FOUND if recipe_id not in found
+                else statuses[recipe_id not in changed]
+            )
+        }
+        for recipe_id in ids
+    ]
+
+
+def change_subscriptions(user, ids, adding):
+    """Подписывает на авторов или отписывает от них."""
+    found = set(User.objects.filter(id__in=ids).values_list('id', flat=True))
+    found.discard(user.id)
+    current = set(user.following.filter(
+        user_id__in=found
+    ).values_list('user_id', flat=True))
+    if adding:
+        new = found - current
+        changed = [author_id for author_id in ids if author_id in new]
+        Subscription.objects.bulk_create(
+            (
+                Subscription(user_id=author_id, subscribe=user)
+                for author_id in changed
+            ),
+            ignore_conflicts=True
+        )
+        statuses = (CREATED, EXISTS)
+    else:
+        changed = [author_id for author_id in ids if author_id in current]
+        user.following.filter(user_id__in=changed).delete()
+        statuses = (DELETED, MISSING)
+    if changed:
+        bump_version_on_commit(USER_VERSION.format(user.id))
+    changed = set(changed)
+    return [
+        {
+            'id': author_id,
+            'status': (
+                SELF if author_id == user.id
+                else NOT_FOUND if author_id not in found
+                else statuses[author_id not in changed]
+            )
+        }
+        for author_id in ids
+    ]
+
+
+@transaction.atomic
+def manage(request, operation, **kwargs):
+    """
+    Массовое добавление (POST) или удаление (DELETE) по списку id.
+
+    Все изменения выполняются в одной транзакции под блокировкой
+    пользователя; в ответе статус по каждому id. Повторный запрос с тем же
+    заголовком Idempotency-Key возвращает сохранённый ответ.
+    """
+    serializer = BulkIdsSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    if kwargs.get('model') is Cart:
+        lock_recipes(serializer.validated_data['ids'])
+    lock_user(request.user)
+    cache_key = idempotency.get_cache_key(request)
+    if cache_key:
+        response = idempotency.replay(request, cache_key)
+        if response is not None:
+            return response
+    response = Response({'results': operation(
+        request.user, serializer.validated_data['ids'],
+        request.method == 'POST', **kwargs
+    )}, status=status.HTTP_200_OK)
+    if cache_key:
+        idempotency.remember(request, cache_key, response)
+    return response
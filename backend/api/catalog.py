@@ -0,0 +1,79 @@
+import gzip
+from hashlib import md5
+from threading import Lock
+
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import quote_etag
+from rest_framework.renderers import JSONRenderer
+
+from core.cache import get_version
+
+
+class PrerenderedCatalog:
+    """
+    Справочник, заранее отрендеренный в JSON и сжатый gzip.
+
+    Байты ответа хранятся в памяти процесса и пересобираются только при
+    смене версии справочника в общем кэше. Записи упорядочены однозначно, а
+    ETag считается по содержимому, поэтому совпадает во всех процессах.
+    Клиенты обязаны перепроверять ответ (no-cache): повторный запрос с
+    If-None-Match дёшево получает 304, а правка справочника видна сразу.
+    """
+
+    def __init__(self, version_name, queryset, serializer_class):
+        self.version_name = version_name
+        self.queryset = queryset
+        self.serializer_class = serializer_class
+        self._lock = Lock()
+        self._version = None
+        self._content = None
+
+    def get_content(self):
+        version = get_version(self.version_name)
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    queryset = self.queryset.all()
+                    body = JSONRenderer().render(self.serializer_class(
+                        queryset.order_by(
+                            *queryset.model._meta.ordering, 'pk'
+                        ),
+                        many=True
+                    ).data)
+                    self._content = (
+                        quote_etag(md5(body).hexdigest()),
+                        body,
+                        gzip.compress(body),
+                    )
+                    self._version = version
+        return self._content
+
+    def response(self, request):
+        etag, body, compressed = self.get_content()
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            if 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', ''):
+                response = HttpResponse(
+                    compressed, content_type=JSONRenderer.media_type
+                )
+                response['Content-Encoding'] = 'gzip'
+            else:
+                response = HttpResponse(
+                    body, content_type=JSONRenderer.media_type
+                )
+        response['ETag'] = etag
+        response['Cache-Control'] = 'public, no-cache'
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
+
+
+class PrerenderedCatalogMixin:
+    """Отдаёт полный список без параметров из PrerenderedCatalog."""
+
+    catalog = None
+
+    def list(self, request, *args, **kwargs):
+        if request.query_params or request.accepted_renderer.format != 'json':
+            return super().list(request, *args, **kwargs)
+        return self.catalog.response(request)
@@ -1,8 +1,19 @@
+import re
+
+from django.contrib.postgres.search import (
+    SearchQuery, SearchRank, SearchVector
+)
+from django.db import connection
+from django.db.models import Q
 from django_filters import rest_framework as filters
+from rest_framework.filters import SearchFilter
 
+from core.constants import RECIPE_SEARCH_CONFIG
 from recipes.models import Recipe
 from users.models import User
 
+FTS_TABLE = 'recipes_recipe_fts'
+
 
 class RecipeFilter(filters.FilterSet):
     """Фильтрация по указанным полям рецепта."""
@@ -33,3 +44,59 @@ class RecipeFilter(filters.FilterSet):
 class IngredientFilter(filters.FilterSet):
     """Фильтрация по частичному вхождению в наименование ингредиента."""
     name = filters.CharFilter(lookup_expr='istartswith', field_name='name')
+
+
+class RecipeSearchFilter(SearchFilter):
+    """
+    Полнотекстовый поиск по названию и описанию рецепта.
+
+    В PostgreSQL используется tsvector с GIN-индексом, в SQLite — таблица
+    FTS5. Результаты упорядочиваются по релевантности, затем по дате
+    публикации.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        search = request.query_params.get(self.search_param, '').strip()
+        if not search:
+            return queryset
+        terms = re.findall(r'\w+', search)
+        if not terms:
+            return queryset.none()
+        if connection.vendor == 'postgresql':
+            queryset = self.search_postgresql(queryset, search)
+        elif connection.vendor == 'sqlite':
+            queryset = self.search_sqlite(queryset, terms)
+        else:
+            return queryset.filter(
+                Q(name__icontains=search) | Q(text__icontains=search)
+            )
+        return queryset.order_by('-search_rank', '-pub_date', '-id')
+
+    @staticmethod
+    def search_postgresql(queryset, search):
+        vector = SearchVector('name', 'text', config=RECIPE_SEARCH_CONFIG)
+        query = SearchQuery(
+            search, config=RECIPE_SEARCH_CONFIG, search_type='websearch'
+        )
+        return queryset.alias(search_vector=vector).annotate(
+            search_rank=SearchRank(vector, query)
+        ).filter(search_vector=query)
+
+    @staticmethod
+    def search_sqlite(queryset, terms):
+        """
+        Таблица FTS5 присоединяется один раз.
+
+        MATCH выполняется однократно, а ранг bm25() вычисляется для каждой
+        найденной строки, без подзапроса на каждого кандидата.
+        """
+        match = ' '.join(f'"{term}"*' for term in terms)
+        return queryset.extra(
+            select={'search_rank': f'-bm25({FTS_TABLE})'},
+            tables=[FTS_TABLE],
+            where=[
+                f'{FTS_TABLE}.rowid = recipes_recipe.id',
+                f'{FTS_TABLE} MATCH %s',
+            ],
+            params=[match],
+        )
@@ -0,0 +1,208 @@
+import json
+import random
+import statistics
+import time
+from itertools import count
+
+from django.core.management import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import (
+    CaptureQueriesContext, setup_test_environment, teardown_test_environment
+)
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, Recipe, Tag
+from users.models import User
+
+PERCENTILES = (50, 95, 99)
+
+
+class Command(BaseCommand):
+    help = (
+        'Команда замеряет время ответа и число запросов к БД основных '
+        'эндпоинтов и сравнивает их с сохранённым базовым прогоном'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeat', type=int, default=50,
+            help='Число замеров на сценарий'
+        )
+        parser.add_argument(
+            '--warmup', type=int, default=5,
+            help='Число прогревочных запросов без замера'
+        )
+        parser.add_argument(
+            '--scenario', action='append', default=None,
+            help='Запустить только указанные сценарии'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--output', help='Файл для сохранения результатов в JSON'
+        )
+        parser.add_argument(
+            '--baseline', help='Файл с результатами базового прогона'
+        )
+        parser.add_argument(
+            '--max-regression', type=float, default=None,
+            help='Допустимый рост p95 в процентах относительно базового'
+        )
+
+    def uncached(self, url):
+        """
+        Добавляет к URL уникальный параметр.
+
+        Иначе после прогрева анонимные сценарии получали бы ответ из кэша
+        AnonymousResponseCacheMixin и замер не включал бы выборку и
+        сериализацию.
+        """
+        separator = '&' if '?' in url else '?'
+        return f'{url}{separator}benchmark={next(self.counter)}'
+
+    def get_scenarios(self):
+        """Сценарии: имя, пользователь и функция, возвращающая URL."""
+        user = User.objects.annotate(
+            cart_count=Count('cart')
+        ).order_by('-cart_count').first()
+        author = User.objects.annotate(
+            recipes_total=Count('recipe')
+        ).order_by('-recipes_total').first()
+        recipe_ids = list(
+            Recipe.objects.order_by('?').values_list('id', flat=True)[:100]
+        )
+        if user is None or not recipe_ids:
+            raise CommandError('В базе нет данных: запустите generate_data')
+        deep_page = min(50, max(1, Recipe.objects.count() // 6))
+        tags = list(Tag.objects.values_list('slug', flat=True)[:2])
+        prefixes = list({
+            name[:3] for name in Ingredient.objects.order_by('?').values_list(
+                'name', flat=True
+            )[:50]
+        })
+        words = [
+            word for name in Recipe.objects.filter(
+                id__in=recipe_ids[:20]
+            ).values_list('name', flat=True)
+            for word in name.split() if len(word) > 3
+        ] or ['борщ']
+        tag_query = '&'.join(f'tags={tag}' for tag in tags)
+        choice = self.random.choice
+        return {
+            'recipes': (None, lambda: '/api/recipes/?limit=6'),
+            'recipes_auth': (user, lambda: '/api/recipes/?limit=6'),
+            'recipes_filtered': (user, lambda: (
+                f'/api/recipes/?limit=6&is_favorited=1&{tag_query}'
+            )),
+            'recipes_author': (None, lambda: (
+                f'/api/recipes/?limit=6&author={author.id}'
+            )),
+            'recipes_deep_page': (None, lambda: (
+                f'/api/recipes/?limit=6&page={deep_page}'
+            )),
+            'recipes_search': (None, lambda: (
+                f'/api/recipes/?limit=6&search={choice(words)}'
+            )),
+            'recipe_detail': (user, lambda: (
+                f'/api/recipes/{choice(recipe_ids)}/'
+            )),
+            'subscriptions': (user, lambda: (
+                '/api/users/subscriptions/?recipes_limit=3'
+            )),
+            'download_shopping_cart': (user, lambda: (
+                '/api/recipes/download_shopping_cart/?format=txt'
+            )),
+            'ingredients_search': (None, lambda: (
+                f'/api/ingredients/?name={choice(prefixes)}'
+            )),
+        }
+
+    @staticmethod
+    def request(client, url):
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            response = client.get(url)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            elapsed = time.perf_counter() - start
+        return response.status_code, elapsed * 1000, len(queries)
+
+    def run_scenario(self, client, get_url, repeat, warmup):
+        timings, queries = [], []
+        for number in range(warmup + repeat):
+            url = self.uncached(get_url())
+            status, elapsed, query_count = self.request(client, url)
+            if status != 200:
+                raise CommandError(f'{url}: ответ {status} вместо 200')
+            if number >= warmup:
+                timings.append(elapsed)
+                queries.append(query_count)
+        cut_points = statistics.quantiles(timings, n=100, method='inclusive')
+        result = {
+            f'p{percentile}': round(cut_points[percentile - 1], 2)
+            for percentile in PERCENTILES
+        }
+        result.update(
+            mean=round(statistics.fmean(timings), 2),
+            queries=max(queries),
+        )
+        return result
+
+    def compare(self, results, baseline, max_regression):
+        regressions = []
+        for name, result in results.items():
+            base = baseline.get(name)
+            if not base:
+                continue
+            change = (result['p95'] - base['p95']) / base['p95'] * 100
+            result['p95_change'] = round(change, 1)
+            result['queries_change'] = result['queries'] - base['queries']
+            if (
+                max_regression is not None and change > max_regression
+                or result['queries_change'] > 0
+            ):
+                regressions.append(name)
+        return regressions
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 2:
+            raise CommandError('Нужно не меньше двух замеров')
+        self.random = random.Random(options['seed'])
+        self.counter = count()
+        setup_test_environment()
+        try:
+            scenarios = self.get_scenarios()
+            names = options['scenario'] or list(scenarios)
+            unknown = set(names) - set(scenarios)
+            if unknown:
+                raise CommandError(
+                    f'Неизвестные сценарии: {", ".join(sorted(unknown))}'
+                )
+            results = {}
+            for name in names:
+                user, get_url = scenarios[name]
+                client = APIClient()
+                if user is not None:
+                    client.force_authenticate(user)
+                results[name] = self.run_scenario(
+                    client, get_url, options['repeat'], options['warmup']
+                )
+                self.stderr.write(f'{name}: {results[name]}')
+        finally:
+            teardown_test_environment()
+        regressions = []
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as file:
+                regressions = self.compare(
+                    results, json.load(file), options['max_regression']
+                )
+        report = json.dumps(results, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(report)
+        self.stdout.write(report)
+        if regressions:
+            raise CommandError(
+                f'Регрессия относительно базового прогона: '
+                f'{", ".join(regressions)}'
+            )
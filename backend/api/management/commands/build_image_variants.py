@@ -0,0 +1,36 @@
+from django.core.management import BaseCommand
+
+from core.constants import AVATAR_IMAGE_VARIANTS, RECIPE_IMAGE_VARIANTS
+from core.images import build_variants, needs_variants
+from recipes.models import Recipe
+from users.models import User
+
+IMAGE_FIELDS = (
+    (Recipe, 'image', RECIPE_IMAGE_VARIANTS),
+    (User, 'avatar', AVATAR_IMAGE_VARIANTS),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Команда строит уменьшенные копии картинок рецептов и аватаров, '
+        'для которых их ещё нет'
+    )
+
+    def handle(self, *args, **options):
+        for model, field_name, variants in IMAGE_FIELDS:
+            built = 0
+            queryset = model.objects.exclude(
+                **{f'{field_name}__in': ('', None)}
+            ).only('pk', field_name, f'{field_name}_variants')
+            for instance in queryset.iterator():
+                if not needs_variants(instance, field_name):
+                    continue
+                build_variants(
+                    model._meta.label, instance.pk, field_name,
+                    getattr(instance, field_name).name, variants
+                )
+                built += 1
+            self.stdout.write(self.style.SUCCESS(
+                f'{model._meta.verbose_name_plural}: обработано {built}'
+            ))
@@ -0,0 +1,76 @@
+import posixpath
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.core.management import BaseCommand
+from django.utils import timezone
+
+from core.constants import MEDIA_CLEAN_DIRS, MEDIA_CLEAN_MIN_AGE
+from core.images import get_variant_names
+from recipes.models import Recipe
+from users.models import User
+
+IMAGE_FIELDS = (
+    (Recipe, 'image'),
+    (User, 'avatar'),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Команда удаляет файлы медиа, на которые не ссылается ни один '
+        'рецепт или пользователь'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать файлы, которые будут удалены'
+        )
+        parser.add_argument(
+            '--min-age', type=int, default=MEDIA_CLEAN_MIN_AGE,
+            help='Не трогать файлы моложе указанного числа минут'
+        )
+
+    @staticmethod
+    def get_referenced():
+        referenced = set()
+        for model, field_name in IMAGE_FIELDS:
+            for name, variants in model.objects.exclude(
+                **{f'{field_name}__in': ('', None)}
+            ).values_list(field_name, f'{field_name}_variants').iterator():
+                referenced.add(name)
+                referenced |= get_variant_names(variants)
+        return referenced
+
+    @staticmethod
+    def walk(path):
+        directories, files = default_storage.listdir(path)
+        for name in files:
+            yield posixpath.join(path, name)
+        for directory in directories:
+            yield from Command.walk(posixpath.join(path, directory))
+
+    def handle(self, *args, **options):
+        referenced = self.get_referenced()
+        threshold = timezone.now() - timedelta(minutes=options['min_age'])
+        removed = size = 0
+        for directory in MEDIA_CLEAN_DIRS:
+            if not default_storage.exists(directory):
+                continue
+            for name in self.walk(directory):
+                if (
+                    name in referenced
+                    or default_storage.get_modified_time(name) > threshold
+                ):
+                    continue
+                removed += 1
+                size += default_storage.size(name)
+                if options['dry_run']:
+                    self.stdout.write(name)
+                else:
+                    default_storage.delete(name)
+        action = 'Будет удалено' if options['dry_run'] else 'Удалено'
+        self.stdout.write(self.style.SUCCESS(
+            f'{action} файлов: {removed}, {size} байт'
+        ))
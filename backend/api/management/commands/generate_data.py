@@ -0,0 +1,190 @@
+import random
+import uuid
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import BaseCommand, CommandError, call_command
+from django.db import transaction
+from django.utils import timezone
+
+from core import short_links
+from core.cache import bump_version
+from core.constants import (
+    GENERATE_DATA_BATCH_SIZE, GENERATE_DATA_PASSWORD, GENERATE_DATA_SKEW,
+    RECIPES_VERSION, USERS_VERSION
+)
+from recipes.models import (
+    Cart, Favorite, Ingredient, IngredientRecipe, Recipe, Tag, TagRecipe
+)
+from users.models import Subscription, User
+
+RECIPE_WORDS = (
+    'борщ', 'суп', 'салат', 'пирог', 'каша', 'рагу', 'плов', 'омлет',
+    'запеканка', 'блины', 'котлеты', 'паста', 'гуляш', 'сырники', 'щи',
+)
+RECIPE_ADJECTIVES = (
+    'домашний', 'быстрый', 'летний', 'сытный', 'лёгкий', 'острый',
+    'бабушкин', 'постный', 'праздничный', 'овощной',
+)
+
+
+def skewed_weights(count, skew=GENERATE_DATA_SKEW):
+    """Веса по закону Ципфа: первые элементы заметно популярнее."""
+    return [1 / (rank ** skew) for rank in range(1, count + 1)]
+
+
+class Command(BaseCommand):
+    help = (
+        'Команда генерирует пользователей, рецепты, избранное, корзины и '
+        'подписки с неравномерным распределением популярности'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument(
+            '--favorites', type=int, default=20,
+            help='Среднее число рецептов в избранном у пользователя'
+        )
+        parser.add_argument(
+            '--cart', type=int, default=5,
+            help='Среднее число рецептов в корзине у пользователя'
+        )
+        parser.add_argument(
+            '--subscriptions', type=int, default=10,
+            help='Среднее число подписок у пользователя'
+        )
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument(
+            '--batch-size', type=int, default=GENERATE_DATA_BATCH_SIZE
+        )
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.ingredient_ids = list(
+            Ingredient.objects.values_list('id', flat=True)
+        )
+        self.tag_ids = list(Tag.objects.values_list('id', flat=True))
+        if not self.ingredient_ids or not self.tag_ids:
+            raise CommandError('Сначала загрузите справочники: load_data')
+        with transaction.atomic():
+            users = self.create_users(options['users'])
+            recipes = self.create_recipes(users, options['recipes'])
+            self.create_links(users, recipes, options)
+        call_command('rebuild_shopping_carts', stdout=self.stdout)
+        bump_version(RECIPES_VERSION)
+        bump_version(USERS_VERSION)
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано пользователей: {len(users)}, рецептов: {len(recipes)}'
+        ))
+
+    def new_ids(self, model, last_id):
+        """id записей, добавленных bulk_create после last_id."""
+        return list(model.objects.filter(pk__gt=last_id).order_by(
+            'pk'
+        ).values_list('pk', flat=True))
+
+    @staticmethod
+    def last_id(model):
+        return model.objects.order_by('-pk').values_list(
+            'pk', flat=True
+        ).first() or 0
+
+    def create_users(self, count):
+        run = uuid.uuid4().hex[:8]
+        password = make_password(GENERATE_DATA_PASSWORD)
+        last_id = self.last_id(User)
+        User.objects.bulk_create((
+            User(
+                username=f'user_{run}_{number}',
+                email=f'user_{run}_{number}@example.com',
+                first_name='Имя', last_name=f'Фамилия {number}',
+                password=password
+            ) for number in range(count)
+        ), batch_size=self.batch_size)
+        self.stdout.write(f'Пользователи: {count}')
+        return self.new_ids(User, last_id)
+
+    def create_recipes(self, user_ids, count):
+        authors = self.random.choices(
+            user_ids, weights=skewed_weights(len(user_ids)), k=count
+        )
+        last_id = self.last_id(Recipe)
+        Recipe.objects.bulk_create((
+            Recipe(
+                author_id=author_id,
+                name=(
+                    f'{self.random.choice(RECIPE_ADJECTIVES)} '
+                    f'{self.random.choice(RECIPE_WORDS)} {number}'
+                ).capitalize(),
+                text=' '.join(self.random.choices(RECIPE_WORDS, k=30)),
+                cooking_time=self.random.randint(5, 180),
+            ) for number, author_id in enumerate(authors)
+        ), batch_size=self.batch_size)
+        recipe_ids = self.new_ids(Recipe, last_id)
+        now = timezone.now()
+        recipes = []
+        for recipe_id in recipe_ids:
+            pub_date = now - timedelta(
+                minutes=self.random.randint(0, 60 * 24 * 365)
+            )
+            recipes.append(Recipe(
+                pk=recipe_id, short_link=short_links.encode(recipe_id),
+                pub_date=pub_date
+            ))
+        Recipe.objects.bulk_update(
+            recipes, ('short_link', 'pub_date'),
+            batch_size=self.batch_size
+        )
+        TagRecipe.objects.bulk_create((
+            TagRecipe(recipe_id=recipe_id, tag_id=tag_id)
+            for recipe_id in recipe_ids
+            for tag_id in self.random.sample(
+                self.tag_ids, self.random.randint(1, len(self.tag_ids))
+            )
+        ), batch_size=self.batch_size)
+        ingredient_weights = skewed_weights(len(self.ingredient_ids), 0.8)
+        IngredientRecipe.objects.bulk_create((
+            IngredientRecipe(
+                recipe_id=recipe_id, ingredient_id=ingredient_id,
+                amount=self.random.randint(1, 500)
+            )
+            for recipe_id in recipe_ids
+            for ingredient_id in set(self.random.choices(
+                self.ingredient_ids, weights=ingredient_weights,
+                k=self.random.randint(3, 12)
+            ))
+        ), batch_size=self.batch_size)
+        self.stdout.write(f'Рецепты: {len(recipe_ids)}')
+        return recipe_ids
+
+    def sample(self, population, weights, mean):
+        """Неповторяющаяся выборка популярных элементов среднего размера."""
+        if not mean:
+            return set()
+        size = min(len(population), int(self.random.expovariate(1 / mean)))
+        return set(self.random.choices(population, weights=weights, k=size))
+
+    def create_links(self, user_ids, recipe_ids, options):
+        recipe_weights = skewed_weights(len(recipe_ids))
+        user_weights = skewed_weights(len(user_ids))
+        for model, mean in (
+            (Favorite, options['favorites']), (Cart, options['cart'])
+        ):
+            objects = model.objects.bulk_create([
+                model(user_id=user_id, recipe_id=recipe_id)
+                for user_id in user_ids
+                for recipe_id in self.sample(recipe_ids, recipe_weights, mean)
+            ], batch_size=self.batch_size)
+            self.stdout.write(
+                f'{model._meta.verbose_name_plural}: {len(objects)}'
+            )
+        objects = Subscription.objects.bulk_create([
+            Subscription(user_id=author_id, subscribe_id=user_id)
+            for user_id in user_ids
+            for author_id in self.sample(
+                user_ids, user_weights, options['subscriptions']
+            ) if author_id != user_id
+        ], batch_size=self.batch_size)
+        self.stdout.write(f'Подписки: {len(objects)}')
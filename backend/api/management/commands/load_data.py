@@ -1,27 +1,218 @@
 import csv
+import io
+import json
+from itertools import islice
+from pathlib import Path
 
 from django.conf import settings
-from django.core.management import BaseCommand
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, transaction
 
+from core.cache import bump_version
+from core.constants import (
+    INGREDIENTS_VERSION, LOAD_DATA_BATCH_SIZE, TAGS_VERSION
+)
 from recipes.models import Ingredient, Tag
 
 RATIO_DATA = {
     Ingredient: 'ingredients.csv',
     Tag: 'tags.csv'
 }
+LOAD_MODELS = {
+    'ingredients': (
+        Ingredient, ('name', 'measurement_unit'), 'name', INGREDIENTS_VERSION
+    ),
+    'tags': (Tag, ('name', 'slug'), 'slug', TAGS_VERSION),
+}
+FORMATS = ('csv', 'json', 'ndjson')
+STAGING_TABLE = 'load_data_staging'
+
+
+def read_csv(file):
+    yield from csv.DictReader(file)
+
+
+def read_json(file):
+    rows = json.load(file)
+    if not isinstance(rows, list):
+        raise CommandError('JSON должен содержать список объектов')
+    yield from rows
+
+
+def read_ndjson(file):
+    for line in file:
+        if line.strip():
+            yield json.loads(line)
+
+
+READERS = {'csv': read_csv, 'json': read_json, 'ndjson': read_ndjson}
 
 
 class Command(BaseCommand):
-    help = 'Команда добавляет данные в БД из csv файлов'
-
-    def handle(self, *args, **kwargs):
-        for model, file in RATIO_DATA.items():
-            with open(
-                    f'{settings.BASE_DIR}/data/{file}',
-                    'r', encoding='utf-8'
-            ) as csv_data:
-                reader = csv.DictReader(csv_data)
-                model.objects.bulk_create(model(**data) for data in reader)
-            self.stdout.write(
-                self.style.SUCCESS('Загрузка прошла успешно')
+    help = (
+        'Команда добавляет данные в БД из файлов csv, json или ndjson; '
+        'без аргументов загружает справочники из каталога data'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'files', nargs='*',
+            help='Файлы для загрузки, по умолчанию data/*.csv'
+        )
+        parser.add_argument(
+            '--model', choices=LOAD_MODELS,
+            help='Справочник; по умолчанию определяется по имени файла'
+        )
+        parser.add_argument(
+            '--format', choices=FORMATS,
+            help='Формат файлов; по умолчанию определяется по расширению'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=LOAD_DATA_BATCH_SIZE,
+            help='Количество строк в одной пачке'
+        )
+        parser.add_argument(
+            '--update', action='store_true',
+            help='Обновлять уже существующие записи вместо пропуска'
+        )
+
+    def handle(self, *args, **options):
+        files = options['files'] or [
+            Path(settings.BASE_DIR) / 'data' / file
+            for file in RATIO_DATA.values()
+        ]
+        for path in map(Path, files):
+            model_name = options['model'] or path.stem
+            if model_name not in LOAD_MODELS:
+                raise CommandError(
+                    f'Не удалось определить справочник для {path}, '
+                    f'укажите --model'
+                )
+            file_format = options['format'] or path.suffix.lstrip('.')
+            if file_format not in READERS:
+                raise CommandError(
+                    f'Неизвестный формат {path}, укажите --format'
+                )
+            model, fields, key, version = LOAD_MODELS[model_name]
+            with open(path, 'r', encoding='utf-8') as file:
+                rows = self.clean_rows(READERS[file_format](file), fields)
+                with transaction.atomic():
+                    if connection.vendor == 'postgresql':
+                        count = self.copy_rows(
+                            model, fields, key, rows, options
+                        )
+                    else:
+                        count = self.insert_rows(
+                            model, fields, key, rows, options
+                        )
+            bump_version(version)
+            self.stdout.write(self.style.SUCCESS(
+                f'Загрузка прошла успешно: {path.name}, '
+                f'добавлено или обновлено строк: {count}'
+            ))
+
+    @staticmethod
+    def clean_rows(rows, fields):
+        for number, row in enumerate(rows, 1):
+            try:
+                values = tuple(str(row[field]).strip() for field in fields)
+            except (KeyError, TypeError):
+                raise CommandError(
+                    f'Строка {number}: нужны поля {", ".join(fields)}'
+                )
+            if all(values):
+                yield values
+
+    @staticmethod
+    def batches(rows, batch_size):
+        rows = iter(rows)
+        while batch := list(islice(rows, batch_size)):
+            yield batch
+
+    def report(self, model, loaded):
+        self.stdout.write(
+            f'{model._meta.verbose_name_plural}: прочитано строк {loaded}'
+        )
+
+    def insert_rows(self, model, fields, key, rows, options):
+        """Пачками через bulk_create с пропуском конфликтов."""
+        count = loaded = 0
+        key_index = fields.index(key)
+        for batch in self.batches(rows, options['batch_size']):
+            batch = list({
+                values[key_index]: values for values in batch
+            }.values())
+            existing = {
+                getattr(instance, key): instance
+                for instance in model.objects.filter(**{
+                    f'{key}__in': [values[key_index] for values in batch]
+                })
+            }
+            model.objects.bulk_create(
+                (model(**dict(zip(fields, values))) for values in batch
+                 if values[key_index] not in existing),
+                ignore_conflicts=True
+            )
+            count += len(batch) - len(existing)
+            if options['update']:
+                changed = []
+                for values in batch:
+                    instance = existing.get(values[key_index])
+                    if instance is None:
+                        continue
+                    if any(getattr(instance, field) != value
+                           for field, value in zip(fields, values)):
+                        for field, value in zip(fields, values):
+                            setattr(instance, field, value)
+                        changed.append(instance)
+                model.objects.bulk_update(changed, fields)
+                count += len(changed)
+            loaded += len(batch)
+            self.report(model, loaded)
+        return count
+
+    def copy_rows(self, model, fields, key, rows, options):
+        """
+        Загрузка через COPY FROM STDIN во временную таблицу.
+
+        Строки передаются пачками в формате CSV, затем переносятся в
+        таблицу справочника одним INSERT ... ON CONFLICT.
+        """
+        quote = connection.ops.quote_name
+        table = quote(model._meta.db_table)
+        column_names = [
+            quote(model._meta.get_field(field).column) for field in fields
+        ]
+        columns = ', '.join(column_names)
+        key_column = quote(model._meta.get_field(key).column)
+        if options['update']:
+            excluded = ', '.join(f'EXCLUDED.{name}' for name in column_names)
+            current = ', '.join(f'{table}.{name}' for name in column_names)
+            conflict = (
+                f'({key_column}) DO UPDATE SET ({columns}) = ROW({excluded}) '
+                f'WHERE ({current}) IS DISTINCT FROM ({excluded})'
+            )
+        else:
+            conflict = 'DO NOTHING'
+        loaded = 0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE TEMPORARY TABLE {STAGING_TABLE} ON COMMIT DROP AS '
+                f'SELECT {columns} FROM {table} WITH NO DATA'
+            )
+            for batch in self.batches(rows, options['batch_size']):
+                buffer = io.StringIO()
+                csv.writer(buffer).writerows(batch)
+                buffer.seek(0)
+                cursor.copy_expert(
+                    f'COPY {STAGING_TABLE} ({columns}) FROM STDIN '
+                    f'WITH (FORMAT csv)', buffer
+                )
+                loaded += len(batch)
+                self.report(model, loaded)
+            cursor.execute(
+                f'INSERT INTO {table} ({columns}) '
+                f'SELECT DISTINCT ON ({key_column}) {columns} '
+                f'FROM {STAGING_TABLE} ON CONFLICT {conflict}'
             )
+            return cursor.rowcount
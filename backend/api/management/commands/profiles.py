@@ -0,0 +1,79 @@
+import io
+import pstats
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+
+from core.constants import PROFILE_TOP_FUNCTIONS
+
+SORT_KEYS = ('cumulative', 'tottime', 'ncalls')
+
+
+class Command(BaseCommand):
+    help = (
+        'Команда выводит список сохранённых профилей запросов и самые '
+        'затратные функции в них'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'names', nargs='*',
+            help='Имена профилей (X-Profile-Id); по умолчанию последние'
+        )
+        parser.add_argument(
+            '--last', type=int, default=10,
+            help='Сколько последних профилей показать'
+        )
+        parser.add_argument(
+            '--filter', default='',
+            help='Показывать только профили, в имени которых есть строка'
+        )
+        parser.add_argument(
+            '--top', type=int, default=PROFILE_TOP_FUNCTIONS,
+            help='Число функций в сводке; 0 — только список'
+        )
+        parser.add_argument('--sort', choices=SORT_KEYS, default='cumulative')
+        parser.add_argument(
+            '--merge', action='store_true',
+            help='Объединить выбранные профили в одну сводку'
+        )
+
+    def get_paths(self, options):
+        directory = Path(settings.PROFILE_DIR)
+        if options['names']:
+            paths = [directory / f'{name}.prof' for name in options['names']]
+            missing = [path.name for path in paths if not path.exists()]
+            if missing:
+                raise CommandError(
+                    f'Профили не найдены: {", ".join(missing)}'
+                )
+            return paths
+        return sorted(
+            path for path in directory.glob('*.prof')
+            if options['filter'] in path.stem
+        )[-options['last']:]
+
+    def summary(self, stats, options):
+        if not options['top']:
+            return
+        buffer = io.StringIO()
+        stats.stream = buffer
+        stats.sort_stats(options['sort']).print_stats(options['top'])
+        self.stdout.write(buffer.getvalue().split('\n\n', 1)[-1])
+
+    def handle(self, *args, **options):
+        paths = self.get_paths(options)
+        if not paths:
+            self.stdout.write('Профилей нет')
+            return
+        for path in paths:
+            stats = pstats.Stats(str(path))
+            self.stdout.write(self.style.SUCCESS(
+                f'{path.stem}: {stats.total_tt * 1000:.1f} мс, '
+                f'вызовов {stats.total_calls}'
+            ))
+            if not options['merge']:
+                self.summary(stats, options)
+        if options['merge']:
+            self.summary(pstats.Stats(*map(str, paths)), options)
@@ -0,0 +1,70 @@
+from django.contrib.auth import get_user_model
+from django.core.management import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes.models import ShoppingCartItem
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Команда пересчитывает агрегированные списки покупок по корзинам '
+        'пользователей или проверяет их с ключом --verify. Списки '
+        'заполняются миграцией и поддерживаются при каждом изменении '
+        'корзины, поэтому команда нужна только для исправления расхождений'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify', action='store_true',
+            help='Только сравнить списки покупок с корзинами'
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if not options['verify']:
+                # Те же блокировки строк пользователей, что и при изменении
+                # корзины, чтобы параллельное изменение не потерялось при
+                # пересоздании строк.
+                list(User.objects.select_for_update().order_by(
+                    'pk'
+                ).values_list('pk', flat=True))
+            expected = ShoppingCartItem.objects.calculate()
+            actual = {
+                (user_id, ingredient_id): amount
+                for user_id, ingredient_id, amount in
+                ShoppingCartItem.objects.values_list(
+                    'user_id', 'ingredient_id', 'amount'
+                )
+            }
+            mismatches = {
+                key for key in expected.keys() | actual.keys()
+                if expected.get(key) != actual.get(key)
+            }
+            if options['verify']:
+                for user_id, ingredient_id in sorted(mismatches):
+                    self.stdout.write(
+                        f'Пользователь {user_id}, ингредиент '
+                        f'{ingredient_id}: ожидается '
+                        f'{expected.get((user_id, ingredient_id), 0)}, '
+                        f'в списке {actual.get((user_id, ingredient_id), 0)}'
+                    )
+                if mismatches:
+                    raise CommandError(
+                        f'Расхождений в списках покупок: {len(mismatches)}'
+                    )
+                self.stdout.write(
+                    self.style.SUCCESS('Списки покупок совпадают с корзинами')
+                )
+                return
+            ShoppingCartItem.objects.all().delete()
+            ShoppingCartItem.objects.bulk_create(
+                ShoppingCartItem(
+                    user_id=user_id, ingredient_id=ingredient_id,
+                    amount=amount
+                ) for (user_id, ingredient_id), amount in expected.items()
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Списки покупок пересчитаны, исправлено строк: {len(mismatches)}'
+        ))
@@ -0,0 +1,99 @@
+import json
+from hashlib import md5
+
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import quote_etag
+from rest_framework.response import Response
+
+from core.cache import get_version
+from core.constants import RESPONSE_CACHE_TIMEOUT
+
+
+def get_request_fingerprint(view, request):
+    """
+    Хэш запроса и версий данных, от которых зависит ответ.
+
+    Версии возвращает метод представления get_data_versions().
+    """
+    params = sorted(
+        (name, sorted(request.query_params.getlist(name)))
+        for name in request.query_params
+    )
+    versions = [get_version(name) for name in view.get_data_versions()]
+    key = json.dumps([
+        view.action, request.get_host(), request.path, params, versions
+    ])
+    return md5(key.encode()).hexdigest()
+
+
+class ConditionalGetMixin:
+    """
+    Поддержка условных GET-запросов для list и retrieve.
+
+    ETag строится из запроса и версий данных, поэтому совпадающий
+    If-None-Match получает 304 до выборки и сериализации. Last-Modified
+    не отправляется: ответ зависит от рецептов, авторов, справочников и
+    коллекций пользователя, и одной даты изменения для него нет.
+    """
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def get_etag(self, request):
+        fingerprint = get_request_fingerprint(self, request)
+        if request.user.is_authenticated:
+            fingerprint = f'{fingerprint}-{request.user.id}'
+        return quote_etag(fingerprint)
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        etag = self.get_etag(request)
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+        else:
+            response = not_modified
+        response['ETag'] = etag
+        patch_vary_headers(response, ('Authorization',))
+        return response
+
+
+class AnonymousResponseCacheMixin:
+    """
+    Кэширует ответы list и retrieve для анонимных пользователей.
+
+    Ответ анонимному пользователю не зависит от того, кто его запросил,
+    поэтому данные сериализатора сохраняются в кэше по ключу из пути,
+    нормализованной строки запроса и версий данных, которые возвращает
+    get_data_versions(). Изменение данных увеличивает версию, и
+    устаревшие записи просто перестают использоваться.
+    """
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return handler(request, *args, **kwargs)
+        key = f'response:{get_request_fingerprint(self, request)}'
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, RESPONSE_CACHE_TIMEOUT)
+        return response
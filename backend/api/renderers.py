@@ -0,0 +1,161 @@
+import csv
+import json
+import logging
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from io import BytesIO
+
+from django.conf import settings
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFError, TTFont
+from reportlab.pdfgen import canvas
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.renderers import BaseRenderer
+
+SHOPPING_LIST_TITLE = 'Список покупок'
+PDF_FONT_NAME = 'ShoppingListFont'
+
+logger = logging.getLogger(__name__)
+
+
+class RendererUnavailable(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Этот формат списка покупок сейчас недоступен'
+
+
+@lru_cache(maxsize=None)
+def register_pdf_font(path):
+    """
+    Регистрирует шрифт для PDF один раз на процесс.
+
+    Неудачная попытка не кэшируется и будет повторена при следующем вызове.
+    """
+    pdfmetrics.registerFont(TTFont(PDF_FONT_NAME, path))
+
+
+class ShoppingListRenderer(ABC, BaseRenderer):
+    """
+    Базовый рендерер списка покупок.
+
+    Список отдаётся потоком через stream(), render() используется только
+    для ответов с ошибками.
+    """
+
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data, ensure_ascii=False).encode()
+
+    def prepare(self):
+        """
+        Проверка перед началом потока.
+
+        Вызывается до отправки заголовков, поэтому ошибка здесь превращается
+        в обычный ответ с ошибкой, а не в оборванное тело.
+        """
+
+    @abstractmethod
+    def stream(self, ingredients):
+        """
+        Возвращает итератор частей ответа.
+
+        ingredients — итератор словарей с ключами name, measurement_unit и
+        quantity, уже отсортированных по названию.
+        """
+
+
+class TextShoppingListRenderer(ShoppingListRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+    def stream(self, ingredients):
+        yield f'{SHOPPING_LIST_TITLE}\n'
+        for ingredient in ingredients:
+            yield (
+                f'{ingredient["name"]} - {ingredient["quantity"]} '
+                f'({ingredient["measurement_unit"]})\n'
+            )
+
+
+class Echo:
+    """Буфер, который возвращает записанную строку вместо хранения."""
+
+    def write(self, value):
+        return value
+
+
+class CSVShoppingListRenderer(ShoppingListRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def stream(self, ingredients):
+        writer = csv.writer(Echo())
+        yield writer.writerow(('name', 'measurement_unit', 'quantity'))
+        for ingredient in ingredients:
+            yield writer.writerow((
+                ingredient['name'], ingredient['measurement_unit'],
+                ingredient['quantity']
+            ))
+
+
+class JSONShoppingListRenderer(ShoppingListRenderer):
+    media_type = 'application/json'
+    format = 'json'
+
+    def stream(self, ingredients):
+        separator = '['
+        for ingredient in ingredients:
+            yield separator + json.dumps(ingredient, ensure_ascii=False)
+            separator = ','
+        yield '[]' if separator == '[' else ']'
+
+
+class PDFShoppingListRenderer(ShoppingListRenderer):
+    """
+    Список покупок в PDF.
+
+    Формат PDF не позволяет писать документ по частям, поэтому он
+    собирается в памяти и отдаётся одним блоком. Для кириллицы нужен
+    TrueType-шрифт из настройки SHOPPING_LIST_PDF_FONT; он регистрируется
+    при запуске приложения, а если это не удалось — повторно в prepare().
+    """
+
+    media_type = 'application/pdf'
+    format = 'pdf'
+    charset = None
+    font_name = PDF_FONT_NAME
+    font_size = 12
+    margin = 50
+
+    def prepare(self):
+        try:
+            register_pdf_font(settings.SHOPPING_LIST_PDF_FONT)
+        except (OSError, TTFError):
+            logger.exception('Не удалось загрузить шрифт для PDF')
+            raise RendererUnavailable
+
+    def stream(self, ingredients):
+        buffer = BytesIO()
+        document = canvas.Canvas(buffer, pagesize=A4)
+        width, height = A4
+        line_height = self.font_size * 1.5
+        lines = TextShoppingListRenderer().stream(ingredients)
+        y = height - self.margin
+        document.setFont(self.font_name, self.font_size)
+        for line in lines:
+            if y < self.margin:
+                document.showPage()
+                document.setFont(self.font_name, self.font_size)
+                y = height - self.margin
+            document.drawString(self.margin, y, line.rstrip('\n'))
+            y -= line_height
+        document.save()
+        yield buffer.getvalue()
+
+
+SHOPPING_LIST_RENDERERS = (
+    TextShoppingListRenderer, CSVShoppingListRenderer,
+    JSONShoppingListRenderer, PDFShoppingListRenderer,
+)
@@ -1,11 +1,14 @@
 from django.db import transaction
-from django.shortcuts import get_object_or_404
 from djoser.serializers import UserSerializer
 from rest_framework import serializers, validators
 
-from core.fields import Base64ImageField
+from core.constants import BULK_MAX_ITEMS, MIN_COUNT, UPLOAD_MAX_SIZE
+from core.fields import (
+    Base64ImageField, ImageVariantField, ImageVariantsField
+)
 from recipes.models import (
-    Cart, Favorite, Ingredient, IngredientRecipe, Recipe, Tag
+    Cart, Favorite, Ingredient, IngredientRecipe, Recipe, ShoppingCartItem,
+    Tag, TagRecipe, lock_recipes
 )
 from users.models import Subscription, User
 
@@ -14,6 +17,8 @@ class IsSubscribedMixin:
     """Миксин для проверки статуса 'подписан'."""
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         return (
             self.context.get('request').user.is_authenticated
             and Subscription.objects.filter(
@@ -27,6 +32,8 @@ class RecipesCountMixin:
 
     @staticmethod
     def get_recipes_count(obj):
+        if hasattr(obj, 'recipes_count'):
+            return obj.recipes_count
         return Recipe.objects.filter(author=obj.id).count()
 
 
@@ -34,6 +41,8 @@ class RecipesMixin:
     """Получение рецептов с возможностью применения параметра 'limit'."""
 
     def get_recipes(self, obj):
+        if hasattr(obj, 'short_recipes'):
+            return ShortRecipeSerializer(obj.short_recipes, many=True).data
         request = self.context.get('request')
         limit = request.GET.get('recipes_limit')
         queryset = Recipe.objects.filter(author=obj.id)
@@ -59,22 +68,16 @@ class IngredientSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'measurement_unit')
         read_only_fields = ('__all__',)
 
-    def to_representation(self, instance):
-        data = super().to_representation(instance)
-        query = self.context['request'].query_params.get('query')
-        if query:
-            data['name'] = data['name'].filter(name__startswith=query)
-            data['name'] = data['name'].filter(
-                name__icontains=query)
-        return data
-
 
 class IngredientRecipeWriteSerializer(serializers.ModelSerializer):
-    """Сериализатор для связи рецептов и ингредиентов"""
+    """
+    Сериализатор для связи рецептов и ингредиентов.
 
-    id = serializers.PrimaryKeyRelatedField(
-        queryset=Ingredient.objects.all()
-    )
+    Существование ингредиентов проверяется в RecipeWriteSerializer одним
+    запросом на весь список.
+    """
+
+    id = serializers.IntegerField()
     amount = serializers.IntegerField()
 
     class Meta:
@@ -117,6 +120,7 @@ class BaseUserSerializer(IsSubscribedMixin, UserSerializer):
     """Сериализатор для просмотра пользователя"""
 
     is_subscribed = serializers.SerializerMethodField()
+    avatar = ImageVariantField('avatar', image_field='avatar')
 
     class Meta:
         model = User
@@ -156,7 +160,7 @@ class SubscriptionSerializer(CustomUserSerializer):
     username = serializers.ReadOnlyField()
     first_name = serializers.ReadOnlyField()
     last_name = serializers.ReadOnlyField()
-    avatar = Base64ImageField(read_only=True)
+    avatar = ImageVariantField('avatar', image_field='avatar')
 
     class Meta:
         model = User
@@ -172,7 +176,7 @@ class SubscriptionWriteSerializer(CustomUserSerializer):
     username = serializers.ReadOnlyField(source='user.username')
     first_name = serializers.ReadOnlyField(source='user.first_name')
     last_name = serializers.ReadOnlyField(source='user.last_name')
-    avatar = Base64ImageField(read_only=True, source='user.avatar')
+    avatar = ImageVariantField('avatar', image_field='avatar', source='user')
 
     class Meta:
         model = Subscription
@@ -191,12 +195,13 @@ class SubscriptionWriteSerializer(CustomUserSerializer):
 class ShortRecipeSerializer(serializers.ModelSerializer):
     """Короткий сериализатор для чтения информации о рецепте"""
 
-    image = Base64ImageField()
+    image = ImageVariantField('card')
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
-        read_only_fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'image_variants', 'cooking_time')
+        read_only_fields = ('id', 'name', 'cooking_time')
 
 
 class RecipeReadSerializer(ShortRecipeSerializer):
@@ -212,21 +217,32 @@ class RecipeReadSerializer(ShortRecipeSerializer):
     author = BaseUserSerializer(read_only=True)
     is_favorited = serializers.SerializerMethodField(read_only=True)
     is_in_shopping_cart = serializers.SerializerMethodField(read_only=True)
+    image = ImageVariantField('detail', list_variant='card')
 
     class Meta:
         model = Recipe
         fields = (
             'id', 'tags', 'author', 'ingredients', 'is_favorited',
-            'is_in_shopping_cart', 'name', 'image', 'text', 'cooking_time'
+            'is_in_shopping_cart', 'name', 'image', 'image_variants', 'text',
+            'cooking_time'
         )
 
+    def to_representation(self, instance):
+        if hasattr(instance, 'author_is_subscribed'):
+            instance.author.is_subscribed = instance.author_is_subscribed
+        return super().to_representation(instance)
+
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         user = self.context.get('request').user
         if user.is_anonymous:
             return False
         return Recipe.objects.filter(cart__user=user, id=obj.id).exists()
 
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         user = self.context.get('request').user
         if user.is_anonymous:
             return False
@@ -239,12 +255,11 @@ class RecipeWriteSerializer(ShortRecipeSerializer):
     """Сериализатор для записи информации о рецепте."""
 
     ingredients = IngredientRecipeWriteSerializer(many=True)
-    tags = serializers.PrimaryKeyRelatedField(
-        many=True, queryset=Tag.objects.all()
-    )
+    tags = serializers.ListField(child=serializers.IntegerField())
     author = serializers.SlugRelatedField(
         slug_field='username', read_only=True
     )
+    image = Base64ImageField()
 
     class Meta:
         model = Recipe
@@ -253,6 +268,45 @@ class RecipeWriteSerializer(ShortRecipeSerializer):
             'author'
         )
 
+    @staticmethod
+    def get_missing(model, ids):
+        """id из списка, которых нет в таблице; один запрос IN."""
+        return set(ids) - set(
+            model.objects.filter(id__in=ids).values_list('id', flat=True)
+        )
+
+    @staticmethod
+    def does_not_exist(pk):
+        return serializers.PrimaryKeyRelatedField.default_error_messages[
+            'does_not_exist'
+        ].format(pk_value=pk)
+
+    def validate_existence(self, tags, ingredients):
+        """
+        Проверяет, что теги и ингредиенты существуют.
+
+        Ошибки имеют ту же структуру, что давали PrimaryKeyRelatedField:
+        для тегов — первый неизвестный id, для ингредиентов — ошибка
+        у каждого элемента списка.
+        """
+        errors = {}
+        missing = self.get_missing(Tag, tags)
+        if missing:
+            errors['tags'] = [self.does_not_exist(
+                next(tag for tag in tags if tag in missing)
+            )]
+        missing = self.get_missing(
+            Ingredient, [ingredient['id'] for ingredient in ingredients]
+        )
+        if missing:
+            errors['ingredients'] = [
+                {'id': [self.does_not_exist(ingredient['id'])]}
+                if ingredient['id'] in missing else {}
+                for ingredient in ingredients
+            ]
+        if errors:
+            raise serializers.ValidationError(errors)
+
     def validate(self, data):
         ingredients = data.get('ingredients')
         tags = data.get('tags')
@@ -264,60 +318,98 @@ class RecipeWriteSerializer(ShortRecipeSerializer):
             raise serializers.ValidationError(
                 {'ingredients': 'Нужен хоть один ингридиент для рецепта'}
             )
-        tag_list = []
-        for tag_current in tags:
-            if tag_current in tag_list:
-                raise serializers.ValidationError(
-                    'Тег должен быть уникальными'
-                )
-            tag_list.append(tag_current)
-        data['tags'] = tags
-        ingredient_list = []
-        for ingredient_current in ingredients:
-            ingredient = get_object_or_404(
-                Ingredient, id=ingredient_current['id'].id
+        self.validate_existence(tags, ingredients)
+        if len(set(tags)) != len(tags):
+            raise serializers.ValidationError(
+                'Тег должен быть уникальными'
+            )
+        amounts = {
+            ingredient['id']: ingredient['amount']
+            for ingredient in ingredients
+        }
+        if len(amounts) != len(ingredients):
+            raise serializers.ValidationError(
+                'Ингридиенты должны быть уникальными'
             )
-            if ingredient in ingredient_list:
-                raise serializers.ValidationError(
-                    'Ингридиенты должны быть уникальными'
-                )
-            ingredient_list.append(ingredient)
-            if int(ingredient_current['amount']) < 1:
-                raise serializers.ValidationError(
-                    {'ingredients': 'Минимальное количество ингридиентов 1'}
-                )
-        data['ingredients'] = ingredients
+        if min(amounts.values()) < MIN_COUNT:
+            raise serializers.ValidationError(
+                {'ingredients': 'Минимальное количество ингридиентов 1'}
+            )
+        data['ingredients'] = amounts
         return data
 
     @staticmethod
-    def create_ingredients(ingredients, recipe):
+    def save_tags(recipe, tag_ids, current):
+        """Удаляет лишние и добавляет недостающие теги рецепта."""
+        tag_ids = set(tag_ids)
+        if current - tag_ids:
+            TagRecipe.objects.filter(
+                recipe=recipe, tag_id__in=current - tag_ids
+            ).delete()
+        TagRecipe.objects.bulk_create(
+            TagRecipe(recipe=recipe, tag_id=tag_id)
+            for tag_id in tag_ids - current
+        )
+
+    @staticmethod
+    def save_ingredients(recipe, amounts, rows):
+        """
+        Приводит ингредиенты рецепта к amounts.
+
+        rows — текущие строки IngredientRecipe по id ингредиента; удаляются
+        только исчезнувшие, обновляются только изменившиеся количества.
+        """
+        removed = rows.keys() - amounts.keys()
+        if removed:
+            IngredientRecipe.objects.filter(
+                recipe=recipe, ingredient_id__in=removed
+            ).delete()
+        changed = []
+        for ingredient_id, row in rows.items():
+            amount = amounts.get(ingredient_id, row.amount)
+            if amount != row.amount:
+                row.amount = amount
+                changed.append(row)
+        IngredientRecipe.objects.bulk_update(changed, ('amount',))
         IngredientRecipe.objects.bulk_create(
             IngredientRecipe(
-                recipe=recipe,
-                amount=ingredient['amount'],
-                ingredient=ingredient['id']
-            ) for ingredient in ingredients
+                recipe=recipe, ingredient_id=ingredient_id, amount=amount
+            )
+            for ingredient_id, amount in amounts.items()
+            if ingredient_id not in rows
         )
 
     @transaction.atomic
     def create(self, validated_data):
-        tags_data = validated_data.pop('tags')
-        ingredients_data = validated_data.pop('ingredients')
+        tags = validated_data.pop('tags')
+        amounts = validated_data.pop('ingredients')
         recipe = Recipe.objects.create(
             **validated_data, author=self.context['request'].user
         )
-        recipe.tags.set(tags_data)
-        self.create_ingredients(ingredients=ingredients_data, recipe=recipe)
+        self.save_tags(recipe, tags, set())
+        self.save_ingredients(recipe, amounts, {})
         return recipe
 
     @transaction.atomic
     def update(self, instance, validated_data):
-        tags = validated_data.pop('tags')
-        instance.tags.clear()
-        instance.tags.set(tags)
-        ingredients = validated_data.pop('ingredients')
-        instance.ingredients.clear()
-        self.create_ingredients(ingredients, instance)
+        lock_recipes([instance.pk])
+        current_tags = set(TagRecipe.objects.filter(
+            recipe=instance
+        ).values_list('tag_id', flat=True))
+        self.save_tags(instance, validated_data.pop('tags'), current_tags)
+        amounts = validated_data.pop('ingredients')
+        rows = {
+            row.ingredient_id: row
+            for row in IngredientRecipe.objects.filter(recipe=instance)
+        }
+        old_amounts = {
+            ingredient_id: row.amount for ingredient_id, row in rows.items()
+        }
+        self.save_ingredients(instance, amounts, rows)
+        if old_amounts != amounts:
+            ShoppingCartItem.objects.change_recipe(
+                instance, old_amounts, amounts
+            )
         return super().update(instance, validated_data)
 
     def to_representation(self, instance):
@@ -337,3 +429,40 @@ class FavoriteSerializer(serializers.ModelSerializer):
     class Meta:
         fields = '__all__'
         model = Favorite
+
+
+class UploadSerializer(serializers.Serializer):
+    """
+    Сериализатор для начала загрузки изображения.
+
+    Файл в поле file загружается целиком, размер в поле size создаёт
+    загрузку по частям.
+    """
+
+    file = serializers.FileField(required=False)
+    size = serializers.IntegerField(
+        required=False, min_value=1, max_value=UPLOAD_MAX_SIZE
+    )
+
+    def validate(self, data):
+        if ('file' in data) == ('size' in data):
+            raise serializers.ValidationError(
+                'Нужно передать либо файл, либо его размер'
+            )
+        if 'file' in data and data['file'].size > UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(
+                {'file': f'Размер файла больше {UPLOAD_MAX_SIZE} байт'}
+            )
+        return data
+
+
+class BulkIdsSerializer(serializers.Serializer):
+    """Список id рецептов или пользователей для массовых операций."""
+
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False, max_length=BULK_MAX_ITEMS
+    )
+
+    def validate_ids(self, ids):
+        return list(dict.fromkeys(ids))
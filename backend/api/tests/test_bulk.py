@@ -0,0 +1,105 @@
+from django.core.cache import cache
+from rest_framework.test import APITestCase
+
+from api.tests.utils import create_ingredient, create_recipe, create_user
+from recipes.models import Cart, ShoppingCartItem
+from users.models import Subscription
+
+CART_URL = '/api/recipes/shopping_cart/bulk/'
+SUBSCRIBE_URL = '/api/users/subscribe/bulk/'
+
+
+class BulkTests(APITestCase):
+    """Массовые операции: статусы по каждому id и Idempotency-Key."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('buyer')
+        cls.author = create_user('author')
+        cls.flour = create_ingredient('Мука')
+        cls.first = create_recipe(
+            cls.author, 'Блины', ingredients=[(cls.flour, 200)]
+        )
+        cls.second = create_recipe(
+            cls.author, 'Оладьи', ingredients=[(cls.flour, 100)]
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.user)
+
+    def request(self, method, url, ids, key=None):
+        extra = {'HTTP_IDEMPOTENCY_KEY': key} if key else {}
+        with self.captureOnCommitCallbacks(execute=True):
+            return getattr(self.client, method)(
+                url, {'ids': ids}, format='json', **extra
+            )
+
+    def statuses(self, response):
+        self.assertEqual(response.status_code, 200)
+        return {
+            item['id']: item['status'] for item in response.json()['results']
+        }
+
+    def cart_amount(self):
+        return ShoppingCartItem.objects.get(
+            user=self.user, ingredient=self.flour
+        ).amount
+
+    def test_cart_mixed_items(self):
+        Cart.objects.create(user=self.user, recipe=self.first)
+        ShoppingCartItem.objects.add_recipe(self.user, self.first)
+        response = self.request(
+            'post', CART_URL, [self.first.id, self.second.id, 999999]
+        )
+        self.assertEqual(self.statuses(response), {
+            self.first.id: 'exists',
+            self.second.id: 'created',
+            999999: 'not_found',
+        })
+        self.assertEqual(self.cart_amount(), 300)
+        response = self.request(
+            'delete', CART_URL, [self.second.id, self.second.id, 999999]
+        )
+        self.assertEqual(self.statuses(response), {
+            self.second.id: 'deleted', 999999: 'not_found',
+        })
+        self.assertEqual(self.cart_amount(), 200)
+        response = self.request('delete', CART_URL, [self.second.id])
+        self.assertEqual(
+            self.statuses(response), {self.second.id: 'missing'}
+        )
+
+    def test_subscriptions_mixed_items(self):
+        response = self.request(
+            'post', SUBSCRIBE_URL, [self.author.id, self.user.id, 999999]
+        )
+        self.assertEqual(self.statuses(response), {
+            self.author.id: 'created',
+            self.user.id: 'self',
+            999999: 'not_found',
+        })
+        self.assertTrue(Subscription.objects.filter(
+            user=self.author, subscribe=self.user
+        ).exists())
+
+    def test_replay_with_same_key(self):
+        ids = [self.first.id]
+        first = self.request('post', CART_URL, ids, key='order-1')
+        self.assertEqual(self.statuses(first), {self.first.id: 'created'})
+        Cart.objects.filter(user=self.user).delete()
+        ShoppingCartItem.objects.filter(user=self.user).delete()
+        replayed = self.request('post', CART_URL, ids, key='order-1')
+        self.assertEqual(replayed.json(), first.json())
+        self.assertEqual(replayed['Idempotent-Replayed'], 'true')
+        self.assertFalse(Cart.objects.filter(user=self.user).exists())
+
+    def test_same_key_with_different_body(self):
+        self.request('post', CART_URL, [self.first.id], key='order-1')
+        response = self.request(
+            'post', CART_URL, [self.second.id], key='order-1'
+        )
+        self.assertEqual(response.status_code, 422)
+        self.assertFalse(Cart.objects.filter(
+            user=self.user, recipe=self.second
+        ).exists())
@@ -0,0 +1,58 @@
+from django.core.cache import cache
+from rest_framework.test import APITestCase
+
+from api.tests.utils import (
+    create_ingredient, create_recipe, create_tag, create_user
+)
+
+
+class RecipeResponseCacheTests(APITestCase):
+    """Кэш ответов анонимным пользователям видит правки справочников."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tag = create_tag('breakfast')
+        cls.ingredient = create_ingredient('Мука')
+        cls.recipe = create_recipe(
+            create_user('author'), 'Блины', tags=[cls.tag],
+            ingredients=[(cls.ingredient, 200)]
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def get_recipe(self, list_view):
+        if list_view:
+            response = self.client.get('/api/recipes/')
+            return response.data['results'][0]
+        return self.client.get(f'/api/recipes/{self.recipe.id}/').data
+
+    def rename(self, instance, **fields):
+        for name, value in fields.items():
+            setattr(instance, name, value)
+        with self.captureOnCommitCallbacks(execute=True):
+            instance.save()
+
+    def test_tag_rename_invalidates_cached_recipes(self):
+        for list_view in (True, False):
+            with self.subTest(list_view=list_view):
+                self.get_recipe(list_view)
+                self.rename(self.tag, name=f'Завтрак {list_view}')
+                self.assertEqual(
+                    self.get_recipe(list_view)['tags'][0]['name'],
+                    f'Завтрак {list_view}'
+                )
+
+    def test_ingredient_rename_invalidates_cached_recipes(self):
+        for list_view in (True, False):
+            with self.subTest(list_view=list_view):
+                self.get_recipe(list_view)
+                self.rename(
+                    self.ingredient, measurement_unit=f'кг {list_view}'
+                )
+                self.assertEqual(
+                    self.get_recipe(list_view)['ingredients'][0][
+                        'measurement_unit'
+                    ],
+                    f'кг {list_view}'
+                )
@@ -0,0 +1,45 @@
+from django.core.cache import cache
+from rest_framework.test import APITestCase
+
+from api.tests.utils import create_ingredient, create_tag
+
+
+class PrerenderedCatalogTests(APITestCase):
+    """Заранее отрендеренные справочники тегов и ингредиентов."""
+
+    def setUp(self):
+        cache.clear()
+
+    def check_catalog(self, url, create):
+        with self.captureOnCommitCallbacks(execute=True):
+            create('first')
+        response = self.client.get(url)
+        self.assertEqual(response['Cache-Control'], 'public, no-cache')
+        etag = response['ETag']
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            create('second')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 2)
+
+    def test_tags(self):
+        self.check_catalog('/api/tags/', create_tag)
+
+    def test_ingredients(self):
+        self.check_catalog('/api/ingredients/', create_ingredient)
+
+    def test_if_none_match_is_parsed(self):
+        create_tag('first')
+        etag = self.client.get('/api/tags/')['ETag']
+        for header, status in (
+            (etag, 304), (f'W/{etag}', 304), ('*', 304),
+            (f'"other", {etag}', 304), ('"other"', 200),
+            (etag[:-1] + 'x"', 200),
+        ):
+            with self.subTest(header=header):
+                self.assertEqual(self.client.get(
+                    '/api/tags/', HTTP_IF_NONE_MATCH=header
+                ).status_code, status)
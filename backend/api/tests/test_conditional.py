@@ -0,0 +1,75 @@
+from django.core.cache import cache
+from rest_framework.test import APITestCase
+
+from api.tests.utils import (
+    create_ingredient, create_recipe, create_tag, create_user
+)
+from recipes.models import Cart, ShoppingCartItem
+
+
+class RecipeConditionalGetTests(APITestCase):
+    """ETag рецептов зависит от справочников тегов и ингредиентов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tag = create_tag('lunch')
+        cls.ingredient = create_ingredient('Соль')
+        cls.recipe = create_recipe(
+            create_user('author'), 'Суп', tags=[cls.tag],
+            ingredients=[(cls.ingredient, 5)]
+        )
+        cls.urls = ('/api/recipes/', f'/api/recipes/{cls.recipe.id}/')
+
+    def setUp(self):
+        cache.clear()
+
+    def assert_modified_after(self, instance, **fields):
+        etags = {}
+        for url in self.urls:
+            response = self.client.get(url)
+            self.assertNotIn('Last-Modified', response)
+            etags[url] = response['ETag']
+            self.assertEqual(
+                self.client.get(url, HTTP_IF_NONE_MATCH=etags[url])
+                .status_code, 304
+            )
+        for name, value in fields.items():
+            setattr(instance, name, value)
+        with self.captureOnCommitCallbacks(execute=True):
+            instance.save()
+        for url in self.urls:
+            self.assertEqual(
+                self.client.get(url, HTTP_IF_NONE_MATCH=etags[url])
+                .status_code, 200
+            )
+
+    def test_tag_rename_changes_etag(self):
+        self.assert_modified_after(self.tag, name='Обед')
+
+    def test_ingredient_rename_changes_etag(self):
+        self.assert_modified_after(self.ingredient, measurement_unit='кг')
+
+
+class ShoppingListConditionalGetTests(APITestCase):
+    """ETag списка покупок зависит от справочника ингредиентов."""
+
+    def test_ingredient_rename_changes_etag(self):
+        user = create_user('buyer')
+        ingredient = create_ingredient('Сахар')
+        recipe = create_recipe(user, 'Компот', ingredients=[(ingredient, 50)])
+        Cart.objects.create(user=user, recipe=recipe)
+        ShoppingCartItem.objects.add_recipe(user, recipe)
+        self.client.force_authenticate(user)
+        url = '/api/recipes/download_shopping_cart/?format=txt'
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304
+        )
+        ingredient.name = 'Тростниковый сахар'
+        with self.captureOnCommitCallbacks(execute=True):
+            ingredient.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(
+            'Тростниковый сахар', b''.join(response.streaming_content).decode()
+        )
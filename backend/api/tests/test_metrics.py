@@ -0,0 +1,21 @@
+from django.test import TestCase, override_settings
+
+
+class MetricsAccessTests(TestCase):
+    """/metrics доступен только с адресов из METRICS_ALLOWED_IPS."""
+
+    def test_loopback_allowed_by_default(self):
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'http_requests', response.content)
+
+    def test_other_address_forbidden(self):
+        response = self.client.get('/metrics', REMOTE_ADDR='10.0.0.5')
+        self.assertEqual(response.status_code, 403)
+
+    @override_settings(METRICS_ALLOWED_IPS=['10.0.0.0/8'])
+    def test_allowed_network(self):
+        response = self.client.get('/metrics', REMOTE_ADDR='10.0.0.5')
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 403)
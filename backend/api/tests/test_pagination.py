@@ -0,0 +1,38 @@
+from django.core.cache import cache
+from rest_framework.test import APITestCase
+
+from api.tests.utils import create_recipe, create_user
+from core.cache import VERSION_KEY
+from core.constants import USER_VERSION
+from recipes.models import Favorite
+
+
+class CountCacheTests(APITestCase):
+    """Кэш количества записей не делится между пользователями."""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = create_user('author')
+        recipes = [
+            create_recipe(author, f'Рецепт {number}') for number in range(3)
+        ]
+        cls.first = create_user('first')
+        cls.second = create_user('second')
+        Favorite.objects.create(user=cls.first, recipe=recipes[0])
+        for recipe in recipes:
+            Favorite.objects.create(user=cls.second, recipe=recipe)
+
+    def setUp(self):
+        cache.clear()
+        for user in (self.first, self.second):
+            cache.set(VERSION_KEY.format(USER_VERSION.format(user.id)), 1)
+
+    def get_count(self, user):
+        self.client.force_authenticate(user)
+        response = self.client.get('/api/recipes/?is_favorited=1&page=1')
+        self.assertEqual(response.status_code, 200)
+        return response.json()['count']
+
+    def test_count_per_user(self):
+        self.assertEqual(self.get_count(self.first), 1)
+        self.assertEqual(self.get_count(self.second), 3)
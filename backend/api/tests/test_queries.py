@@ -0,0 +1,73 @@
+from django.core.cache import cache
+from rest_framework.test import APITestCase
+
+from api.tests.utils import (
+    create_ingredient, create_recipe, create_tag, create_user
+)
+from core.testing import QueryBudgetMixin
+from recipes.models import Cart, Favorite
+from users.models import Subscription
+
+
+class QueryCountTests(QueryBudgetMixin, APITestCase):
+    """Число запросов к БД не зависит от размера страницы."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('reader')
+        cls.tags = [create_tag('breakfast'), create_tag('dinner')]
+        cls.ingredients = [
+            create_ingredient(name) for name in ('Мука', 'Яйца', 'Молоко')
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.user)
+
+    def add_recipes(self, author, count):
+        for number in range(count):
+            recipe = create_recipe(
+                author, f'Рецепт {author.username} {number}', tags=self.tags,
+                ingredients=[(item, 10) for item in self.ingredients]
+            )
+            Favorite.objects.create(user=self.user, recipe=recipe)
+            Cart.objects.create(user=self.user, recipe=recipe)
+
+    def add_author(self, number):
+        author = create_user(f'author{number}')
+        Subscription.objects.create(user=author, subscribe=self.user)
+        self.add_recipes(author, 2)
+        return author
+
+    def count_queries(self, url):
+        cache.clear()
+        with self.assertQueryBudget(None) as recorder:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        return recorder.count
+
+    def assert_constant(self, url, grow):
+        grow(1)
+        small = self.count_queries(url)
+        grow(5)
+        self.assertEqual(self.count_queries(url), small)
+        self.assertEndpointBudget(url)
+
+    def test_recipe_list(self):
+        author = create_user('author')
+        self.assert_constant(
+            '/api/recipes/?limit=10',
+            lambda count: self.add_recipes(author, count)
+        )
+
+    def test_recipe_detail(self):
+        author = self.add_author(0)
+        self.assertEndpointBudget(f'/api/recipes/{author.recipe.first().id}/')
+
+    def test_subscriptions(self):
+        numbers = iter(range(100))
+        self.assert_constant(
+            '/api/users/subscriptions/?limit=10&recipes_limit=1',
+            lambda count: [
+                self.add_author(next(numbers)) for _ in range(count)
+            ]
+        )
@@ -0,0 +1,35 @@
+from django.test import TestCase
+
+from api.tests.utils import create_recipe, create_user
+from core.testing import QueryBudgetMixin, query_budget
+from recipes.models import Recipe
+
+
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Проверки инструмента бюджета запросов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.authors = [create_user(f'author{number}') for number in range(4)]
+        for author in cls.authors:
+            create_recipe(author, f'Рецепт {author.username}')
+
+    def test_within_budget(self):
+        with query_budget(1, threshold=3) as recorder:
+            list(Recipe.objects.select_related('author'))
+        self.assertEqual(recorder.count, 1)
+
+    def test_budget_exceeded(self):
+        with self.assertRaisesMessage(AssertionError, '2 > 1'):
+            with query_budget(1, threshold=None):
+                list(Recipe.objects.all())
+                list(Recipe.objects.all())
+
+    def test_nplusone_detected(self):
+        with self.assertRaisesMessage(AssertionError, 'N+1'):
+            with query_budget(None, threshold=3):
+                for author in self.authors:
+                    Recipe.objects.filter(author=author).count()
+
+    def test_endpoint_budget(self):
+        self.assertEndpointBudget('/api/recipes/')
@@ -0,0 +1,57 @@
+import base64
+from io import BytesIO
+
+from PIL import Image
+from rest_framework.test import APITestCase
+
+from api.tests.utils import create_ingredient, create_tag, create_user
+
+MISSING = 'Недопустимый первичный ключ "{}" - объект не существует.'
+
+
+def png_data_uri():
+    buffer = BytesIO()
+    Image.new('RGB', (1, 1)).save(buffer, 'PNG')
+    return 'data:image/png;base64,' + base64.b64encode(
+        buffer.getvalue()
+    ).decode()
+
+
+class RecipeValidationTests(APITestCase):
+    """Структура ошибок при записи рецепта."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('author')
+        cls.tag = create_tag('dinner')
+        cls.ingredient = create_ingredient('Мука')
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def post(self, tags, ingredients):
+        return self.client.post('/api/recipes/', {
+            'name': 'Блины', 'text': 'Описание', 'cooking_time': 10,
+            'image': png_data_uri(), 'tags': tags,
+            'ingredients': ingredients,
+        }, format='json')
+
+    def test_unknown_ingredient_error_is_nested(self):
+        response = self.post([self.tag.id], [
+            {'id': self.ingredient.id, 'amount': 1},
+            {'id': 999, 'amount': 1},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {
+            'ingredients': [{}, {'id': [MISSING.format(999)]}]
+        })
+
+    def test_unknown_tag_and_ingredient(self):
+        response = self.post([self.tag.id, 998, 997], [
+            {'id': 999, 'amount': 1},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {
+            'tags': [MISSING.format(998)],
+            'ingredients': [{'id': [MISSING.format(999)]}],
+        })
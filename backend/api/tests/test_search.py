@@ -0,0 +1,128 @@
+from unittest import skipUnless
+
+from django.core.cache import cache
+from django.core.management.sql import emit_post_migrate_signal
+from django.db import DEFAULT_DB_ALIAS, connection
+from rest_framework.test import APITestCase
+
+from api.tests.utils import create_ingredient, create_recipe, create_user
+from core.cache import bump_version
+from core.constants import INGREDIENTS_VERSION
+from recipes.search import IngredientIndex
+
+
+class RecipeSearchTests(APITestCase):
+    """Полнотекстовый поиск на полностью промигрированной базе."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        cls.borscht = create_recipe(
+            cls.author, 'Борщ', 'Свёкла, капуста и картофель'
+        )
+        cls.salad = create_recipe(cls.author, 'Салат', 'Огурцы и помидоры')
+
+    def setUp(self):
+        cache.clear()
+
+    def search(self, query, **params):
+        response = self.client.get(
+            '/api/recipes/', {'search': query, **params}
+        )
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def test_search_finds_recipe_after_migrations(self):
+        self.assertEqual(self.search('борщ'), [self.borscht.id])
+
+    def test_search_sees_changed_recipe(self):
+        self.salad.name = 'Летний борщ'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.salad.save()
+        self.assertCountEqual(
+            self.search('борщ'), [self.borscht.id, self.salad.id]
+        )
+
+    def test_search_ranks_by_relevance(self):
+        soup = create_recipe(
+            self.author, 'Суп', 'Подаётся вместо борща, если нет свёклы'
+        )
+        best = create_recipe(
+            self.author, 'Борщ украинский', 'Борщ варят с салом, борщ густой'
+        )
+        found = self.search('борщ')
+        self.assertEqual(found[0], best.id)
+        self.assertCountEqual(found, [best.id, self.borscht.id, soup.id])
+
+    def test_cursor_keeps_relevance_order(self):
+        best = create_recipe(
+            self.author, 'Борщ украинский', 'Борщ варят с салом, борщ густой'
+        )
+        create_recipe(self.author, 'Суп', 'Подаётся вместо борща')
+        found = self.search('борщ')
+        self.assertEqual(found[0], best.id)
+        self.assertEqual(found, self.search('борщ', cursor=''))
+        pages, url = [], '/api/recipes/'
+        params = {'search': 'борщ', 'cursor': '', 'limit': 1}
+        while url:
+            response = self.client.get(url, params)
+            pages += [recipe['id'] for recipe in response.data['results']]
+            url, params = response.data['next'], None
+        self.assertEqual(pages, found)
+
+    @skipUnless(connection.vendor == 'sqlite', 'Триггеры FTS5 есть в SQLite')
+    def test_post_migrate_restores_dropped_triggers(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TRIGGER recipes_recipe_fts_au')
+        emit_post_migrate_signal(0, False, DEFAULT_DB_ALIAS)
+        self.salad.name = 'Борщ из огурцов'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.salad.save()
+        self.assertIn(self.salad.id, self.search('огурцов'))
+        self.assertIn(self.salad.id, self.search('борщ'))
+
+
+class IngredientSearchTests(APITestCase):
+    """Суффиксный массив ингредиентов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ingredients = {
+            name: create_ingredient(name) for name in (
+                'Молоко', 'Сгущённое молоко', 'Кокосовое молоко',
+                'Мука', 'Ёмкость', 'Кукуруза',
+            )
+        }
+
+    def setUp(self):
+        cache.clear()
+        self.index = IngredientIndex()
+
+    def search(self, query, limit=None):
+        return [
+            ingredient.name
+            for ingredient in self.index.search(query, limit=limit)
+        ]
+
+    def test_ranking(self):
+        self.assertEqual(
+            self.search('мол'),
+            ['Молоко', 'Кокосовое молоко', 'Сгущённое молоко']
+        )
+        self.assertEqual(self.search('ук'), ['Кукуруза', 'Мука'])
+        self.assertEqual(
+            self.search('ко', limit=3),
+            ['Кокосовое молоко', 'Ёмкость', 'Молоко']
+        )
+
+    def test_normalization(self):
+        self.assertEqual(self.search('  ЕМК '), ['Ёмкость'])
+        self.assertEqual(self.search('щенное м'), ['Сгущённое молоко'])
+        self.assertEqual(self.search('ко мо'), [])
+        self.assertEqual(self.search('\x00'), [])
+
+    def test_rebuild_after_version_change(self):
+        self.assertEqual(self.search('сыр'), [])
+        create_ingredient('Сыр')
+        bump_version(INGREDIENTS_VERSION)
+        self.assertEqual(self.search('сыр'), ['Сыр'])
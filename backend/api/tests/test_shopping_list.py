@@ -0,0 +1,116 @@
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from api.tests.utils import create_ingredient, create_recipe, create_user
+from recipes.models import Cart, ShoppingCartItem
+
+URL = '/api/recipes/download_shopping_cart/'
+
+
+class ShoppingListDownloadTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('buyer')
+        recipe = create_recipe(
+            cls.user, 'Каша', ingredients=[(create_ingredient('Крупа'), 100)]
+        )
+        Cart.objects.create(user=cls.user, recipe=recipe)
+        ShoppingCartItem.objects.add_recipe(cls.user, recipe)
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def test_formats(self):
+        for file_format, start in (
+            ('txt', 'Список'.encode()), ('csv', b'name'), ('json', b'['),
+            ('pdf', b'%PDF'),
+        ):
+            with self.subTest(file_format=file_format):
+                response = self.client.get(URL, {'format': file_format})
+                self.assertEqual(response.status_code, 200)
+                body = b''.join(response.streaming_content)
+                self.assertTrue(body.startswith(start))
+
+    @override_settings(SHOPPING_LIST_PDF_FONT='/nonexistent/font.ttf')
+    def test_missing_pdf_font_fails_before_streaming(self):
+        with self.assertLogs('api.renderers', 'ERROR'):
+            response = self.client.get(URL, {'format': 'pdf'})
+        self.assertEqual(response.status_code, 503)
+        self.assertFalse(response.streaming)
+
+
+class ShoppingCartItemTests(APITestCase):
+    """Агрегированный список покупок при изменении рецепта."""
+
+    def test_change_recipe_updates_every_cart(self):
+        author = create_user('author')
+        flour, eggs, milk = (
+            create_ingredient(name) for name in ('Мука', 'Яйца', 'Молоко')
+        )
+        recipe = create_recipe(
+            author, 'Блины', ingredients=[(flour, 200), (eggs, 2)]
+        )
+        for username in ('first', 'second'):
+            user = create_user(username)
+            Cart.objects.create(user=user, recipe=recipe)
+            ShoppingCartItem.objects.add_recipe(user, recipe)
+        ShoppingCartItem.objects.change_recipe(
+            recipe, {flour.id: 200, eggs.id: 2}, {flour.id: 250, milk.id: 500}
+        )
+        self.assertEqual(
+            {
+                (item.user_id, item.ingredient_id): item.amount
+                for item in ShoppingCartItem.objects.filter(
+                    user__username__in=('first', 'second')
+                )
+            },
+            {
+                (user_id, ingredient_id): amount
+                for user_id in Cart.objects.filter(
+                    recipe=recipe
+                ).values_list('user_id', flat=True)
+                for ingredient_id, amount in (
+                    (flour.id, 250), (milk.id, 500)
+                )
+            }
+        )
+
+    def test_remove_recipe_larger_than_aggregate(self):
+        user = create_user('buyer')
+        flour = create_ingredient('Мука')
+        first = create_recipe(user, 'Блины', ingredients=[(flour, 100)])
+        second = create_recipe(user, 'Оладьи', ingredients=[(flour, 50)])
+        # Корзина без строк в списке покупок, как до его заполнения.
+        Cart.objects.create(user=user, recipe=first)
+        self.client.force_authenticate(user)
+        self.assertEqual(self.client.post(
+            f'/api/recipes/{second.id}/shopping_cart/'
+        ).status_code, 201)
+        self.assertEqual(self.client.delete(
+            f'/api/recipes/{first.id}/shopping_cart/'
+        ).status_code, 204)
+        self.assertFalse(
+            ShoppingCartItem.objects.filter(user=user, amount__lte=0).exists()
+        )
+
+    def test_rebuild_repairs_drift(self):
+        user = create_user('buyer')
+        flour = create_ingredient('Мука')
+        recipe = create_recipe(user, 'Блины', ingredients=[(flour, 100)])
+        Cart.objects.create(user=user, recipe=recipe)
+        with self.assertRaises(CommandError):
+            call_command(
+                'rebuild_shopping_carts', verify=True, stdout=StringIO()
+            )
+        call_command('rebuild_shopping_carts', stdout=StringIO())
+        self.assertEqual(
+            list(ShoppingCartItem.objects.filter(user=user).values_list(
+                'ingredient_id', 'amount'
+            )),
+            [(flour.id, 100)]
+        )
+        call_command('rebuild_shopping_carts', verify=True, stdout=StringIO())
@@ -0,0 +1,50 @@
+from django.test import TestCase
+
+from api.tests.utils import create_recipe, create_user
+from api.views import resolve_short_link
+from core import short_links
+from recipes.models import Recipe
+
+
+class ShortLinkTests(TestCase):
+    """Короткие ссылки ведут на рецепт, включая выданные до перехода."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.recipe = create_recipe(create_user('author'), 'Борщ')
+
+    def setUp(self):
+        resolve_short_link.cache_clear()
+
+    def assert_redirects_to_recipe(self, code):
+        response = self.client.get(f'/s/{code}/')
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(
+            response['Location'].endswith(f'/recipes/{self.recipe.id}')
+        )
+
+    def test_code_from_pk(self):
+        self.assertEqual(
+            self.recipe.short_link, short_links.encode(self.recipe.id)
+        )
+        self.assert_redirects_to_recipe(self.recipe.short_link)
+
+    def test_legacy_slug(self):
+        Recipe.objects.filter(pk=self.recipe.pk).update(
+            legacy_short_link='борщ-по-домашнему'
+        )
+        self.assert_redirects_to_recipe('борщ-по-домашнему')
+
+    def test_legacy_slug_colliding_with_code(self):
+        other = create_recipe(self.recipe.author, 'Каша')
+        Recipe.objects.filter(pk=self.recipe.pk).update(
+            legacy_short_link=other.short_link
+        )
+        self.assert_redirects_to_recipe(other.short_link)
+
+    def test_unknown_code(self):
+        deleted = create_recipe(self.recipe.author, 'Каша')
+        code = deleted.short_link
+        deleted.delete()
+        self.assertEqual(self.client.get(f'/s/{code}/').status_code, 404)
+        self.assertEqual(self.client.get('/s/нет-такой/').status_code, 404)
@@ -0,0 +1,30 @@
+import os
+import shutil
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.test import SimpleTestCase
+
+from core.storage import ContentAddressedStorage
+
+
+class ContentAddressedStorageTests(SimpleTestCase):
+    """Повторная загрузка того же содержимого."""
+
+    def setUp(self):
+        self.location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.location)
+        self.storage = ContentAddressedStorage(location=self.location)
+
+    def test_same_content_same_name(self):
+        first = self.storage.save('image/a.png', ContentFile(b'data'))
+        second = self.storage.save('image/b.PNG', ContentFile(b'data'))
+        self.assertEqual(first, second)
+        self.assertTrue(first.endswith('.png'))
+
+    def test_dedupe_refreshes_mtime(self):
+        name = self.storage.save('image/a.png', ContentFile(b'data'))
+        path = self.storage.path(name)
+        os.utime(path, (0, 0))
+        self.storage.save('image/a.png', ContentFile(b'data'))
+        self.assertGreater(os.path.getmtime(path), 0)
@@ -0,0 +1,102 @@
+import shutil
+import tempfile
+import threading
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.test import override_settings
+from PIL import Image
+from rest_framework.test import APITestCase
+
+from api.tests.utils import create_user
+from core.uploads import (
+    UploadOffsetConflict, create_upload, get_path, open_upload, write_chunk
+)
+
+
+class SlowStream(BytesIO):
+    """Поток, первое чтение которого ждёт сигнала."""
+
+    def __init__(self, content):
+        super().__init__(content)
+        self.reading = threading.Event()
+        self.release = threading.Event()
+
+    def read(self, size=-1):
+        self.reading.set()
+        self.release.wait(5)
+        return super().read(size)
+
+
+def png_bytes():
+    buffer = BytesIO()
+    Image.new('RGB', (2, 2)).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+class UploadTests(APITestCase):
+    """Загрузка изображения по частям."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('author')
+
+    def setUp(self):
+        upload_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, upload_dir)
+        settings = override_settings(UPLOAD_DIR=upload_dir)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.client.force_authenticate(self.user)
+        self.content = png_bytes()
+        response = self.client.post(
+            '/api/uploads/', {'size': len(self.content)}, format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.url = f'/api/uploads/{response.json()["id"]}/'
+
+    def patch(self, **extra):
+        return self.client.patch(
+            self.url, self.content,
+            content_type='application/offset+octet-stream',
+            HTTP_UPLOAD_OFFSET='0', **extra
+        )
+
+    def test_chunk_upload(self):
+        response = self.patch()
+        self.assertEqual(response.status_code, 200)
+        file = open_upload(self.user, response.json()['token'])
+        self.assertIsInstance(file, ContentFile)
+        self.assertEqual(file.read(), self.content)
+        self.assertTrue(file.name.endswith('.png'))
+
+    def test_chunk_without_content_length(self):
+        response = self.patch(CONTENT_LENGTH='')
+        self.assertEqual(response.status_code, 411)
+        self.assertEqual(self.client.get(self.url).json()['offset'], 0)
+
+    def test_concurrent_chunks_with_same_offset(self):
+        meta = create_upload(self.user, len(self.content))
+        slow = SlowStream(self.content)
+        errors = []
+
+        def write(stream):
+            try:
+                write_chunk(dict(meta), 0, stream)
+            except UploadOffsetConflict as error:
+                errors.append(error)
+
+        first = threading.Thread(target=write, args=(slow,))
+        first.start()
+        self.assertTrue(slow.reading.wait(5))
+        second = threading.Thread(
+            target=write, args=(BytesIO(self.content),)
+        )
+        second.start()
+        second.join(0.2)
+        slow.release.set()
+        first.join(5)
+        second.join(5)
+        self.assertEqual(len(errors), 1)
+        with open(get_path(meta['id']), 'rb') as file:
+            self.assertEqual(file.read(), self.content)
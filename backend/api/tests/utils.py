@@ -0,0 +1,32 @@
+from recipes.models import Ingredient, IngredientRecipe, Recipe, Tag
+from users.models import User
+
+
+def create_user(username, **kwargs):
+    return User.objects.create_user(
+        username=username, email=f'{username}@example.com',
+        password='password', first_name='Имя', last_name='Фамилия', **kwargs
+    )
+
+
+def create_tag(slug):
+    return Tag.objects.create(name=slug, slug=slug)
+
+
+def create_ingredient(name, measurement_unit='г'):
+    return Ingredient.objects.create(
+        name=name, measurement_unit=measurement_unit
+    )
+
+
+def create_recipe(author, name, text='Описание', tags=(), ingredients=()):
+    """Рецепт с тегами и ингредиентами вида (ингредиент, количество)."""
+    recipe = Recipe.objects.create(
+        author=author, name=name, text=text, cooking_time=10
+    )
+    recipe.tags.set(tags)
+    IngredientRecipe.objects.bulk_create(
+        IngredientRecipe(recipe=recipe, ingredient=ingredient, amount=amount)
+        for ingredient, amount in ingredients
+    )
+    return recipe
@@ -2,7 +2,7 @@ from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
 from api.views import (
-    IngredientViewSet, RecipeBaseViewSet, TagViewSet,
+    IngredientViewSet, RecipeBaseViewSet, TagViewSet, UploadViewSet,
     UserViewSet
 )
 
@@ -13,6 +13,7 @@ router_v_1.register('users', UserViewSet, basename='users')
 router_v_1.register('recipes', RecipeBaseViewSet, basename='recipes')
 router_v_1.register('tags', TagViewSet, basename='tags')
 router_v_1.register('ingredients', IngredientViewSet, basename='ingredients')
+router_v_1.register('uploads', UploadViewSet, basename='uploads')
 
 urlpatterns = [
     path('', include(router_v_1.urls)),
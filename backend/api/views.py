@@ -1,49 +1,102 @@
+import json
+from collections import defaultdict
+from functools import lru_cache
+from hashlib import md5
+
 from django.contrib.auth import get_user_model
-from django.db.models import Sum
-from django.http import HttpResponse, Http404
+from django.db import transaction
+from django.db.models import (
+    BooleanField, Count, Exists, F, OuterRef, Value
+)
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import redirect
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser import views as d_views
 from rest_framework import filters, status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.generics import get_object_or_404
+from rest_framework.parsers import JSONParser, MultiPartParser
 from rest_framework.permissions import (
     AllowAny, IsAuthenticated, IsAuthenticatedOrReadOnly
 )
 from rest_framework.response import Response
 
-from api.filters import RecipeFilter, IngredientFilter
+from api import bulk
+from api.catalog import PrerenderedCatalog, PrerenderedCatalogMixin
+from api.filters import IngredientFilter, RecipeFilter, RecipeSearchFilter
+from api.mixins import AnonymousResponseCacheMixin, ConditionalGetMixin
 from api.permissions import AdminAuthorPermission
+from api.renderers import SHOPPING_LIST_RENDERERS
 from api.serializers import (
     AvatarSerializer, IngredientSerializer, RecipeReadSerializer,
     RecipeWriteSerializer, ShortRecipeSerializer, SubscriptionSerializer,
-    TagSerializer, SubscriptionWriteSerializer
+    TagSerializer, SubscriptionWriteSerializer, UploadSerializer
 )
-from core.pagination import LimitPageNumberPagination
+from core import short_links, uploads
+from core.cache import get_version
+from core.constants import (
+    INGREDIENT_SEARCH_MAX_LIMIT, INGREDIENTS_VERSION, RECIPE_VERSION,
+    RECIPES_VERSION, SHORT_LINK_CACHE_SIZE, TAGS_VERSION, USER_VERSION,
+    USERS_VERSION
+)
+from core.pagination import LimitKeysetPagination
 from recipes.models import (
-    Cart, Favorite, Ingredient, Recipe, Tag
+    Cart, Favorite, Ingredient, Recipe, ShoppingCartItem, Tag, lock_recipes
 )
+from recipes.search import ingredient_index
 from users.models import Subscription
 
 User = get_user_model()
 
 
-class RecipeBaseViewSet(viewsets.ModelViewSet):
+class RecipeBaseViewSet(
+    ConditionalGetMixin, AnonymousResponseCacheMixin, viewsets.ModelViewSet
+):
     """
     Представление для модели Recipes.
 
-    В представлении доступна фильтрация по избранному, автору, списку
-    покупок и тегам. Реализованы методы по удалению и добавлению в избранное
-    и в список покупок.
+    В представлении доступны полнотекстовый поиск по названию и описанию и
+    фильтрация по избранному, автору, списку покупок и тегам. Реализованы
+    методы по удалению и добавлению в избранное и в список покупок.
     """
 
     http_method_names = ('get', 'post', 'patch', 'delete')
     queryset = Recipe.objects.all().order_by('-pub_date')
-    pagination_class = LimitPageNumberPagination
+    pagination_class = LimitKeysetPagination
+    cursor_ordering = ('-pub_date', '-id')
     permission_classes = (AdminAuthorPermission,)
-    filter_backends = (filters.SearchFilter, DjangoFilterBackend)
+    filter_backends = (RecipeSearchFilter, DjangoFilterBackend)
     filterset_class = RecipeFilter
     filterset_fields = ('author',)
+    query_budget = {
+        'list': 6, 'retrieve': 6, 'get_link': 2, 'download_shopping_cart': 2,
+    }
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ('list', 'retrieve'):
+            return queryset.for_read(self.request.user)
+        return queryset.with_user_flags(self.request.user)
+
+    def get_count_versions(self):
+        versions = [RECIPES_VERSION]
+        if self.request.user.is_authenticated:
+            versions.append(USER_VERSION.format(self.request.user.id))
+        return versions
+
+    def get_data_versions(self):
+        if self.action == 'retrieve':
+            versions = [RECIPE_VERSION.format(self.kwargs[self.lookup_field])]
+        else:
+            versions = [RECIPES_VERSION]
+        versions += [USERS_VERSION, TAGS_VERSION, INGREDIENTS_VERSION]
+        if self.request.user.is_authenticated:
+            versions.append(USER_VERSION.format(self.request.user.id))
+        return versions
 
     def get_serializer_class(self):
         if self.action in ('list', 'retrieve'):
@@ -51,9 +104,17 @@ class RecipeBaseViewSet(viewsets.ModelViewSet):
         return RecipeWriteSerializer
 
     @staticmethod
+    @transaction.atomic
     def manage_for_add_and_delete(request, model, pk):
-        """Метод для добавления и удаления рецепта из коллекции."""
+        """
+        Метод для добавления и удаления рецепта из коллекции.
+
+        Изменения корзины сразу переносятся в агрегированный список покупок.
+        """
         user = request.user
+        if model is Cart:
+            lock_recipes([pk])
+        bulk.lock_user(user)
         recipe_in_collection = get_object_or_404(Recipe, id=pk)
         recipe_current_user = model.objects.filter(user=user, recipe__id=pk)
         is_a_recipe = recipe_current_user.exists()
@@ -63,10 +124,18 @@ class RecipeBaseViewSet(viewsets.ModelViewSet):
                     'errors': 'Рецепт уже добавлен в список'
                 }, status=status.HTTP_400_BAD_REQUEST)
             model.objects.create(user=user, recipe=recipe_in_collection)
+            if model is Cart:
+                ShoppingCartItem.objects.add_recipe(
+                    user, recipe_in_collection
+                )
             serializer = ShortRecipeSerializer(recipe_in_collection)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         if is_a_recipe:
             recipe_current_user.delete()
+            if model is Cart:
+                ShoppingCartItem.objects.remove_recipe(
+                    user, recipe_in_collection
+                )
             return Response(status=status.HTTP_204_NO_CONTENT)
         return Response(
             {
@@ -90,50 +159,109 @@ class RecipeBaseViewSet(viewsets.ModelViewSet):
         """Метод добавляет или удаляет рецепт из избранного."""
         return self.manage_for_add_and_delete(request, Favorite, pk)
 
+    @action(
+        methods=['post', 'delete'], detail=False,
+        url_path='shopping_cart/bulk', permission_classes=[IsAuthenticated]
+    )
+    def bulk_shopping_cart(self, request):
+        """Добавляет или удаляет из корзины несколько рецептов сразу."""
+        return bulk.manage(request, bulk.change_recipes, model=Cart)
+
+    @action(
+        methods=['post', 'delete'], detail=False,
+        url_path='favorite/bulk', permission_classes=[IsAuthenticated]
+    )
+    def bulk_favorite(self, request):
+        """Добавляет или удаляет из избранного несколько рецептов сразу."""
+        return bulk.manage(request, bulk.change_recipes, model=Favorite)
+
     @action(detail=True, url_path='get-link')
     def get_link(self, request, pk=None):
-        get_recipe = self.get_object()
-        base_url = request.get_host()
-        short_link = f'https://{base_url}/s/{get_recipe.short_link}'
-        return Response({'short-link': short_link})
+        short_link = get_object_or_404(
+            Recipe.objects.values_list('short_link', flat=True), pk=pk
+        )
+        return Response({'short-link': (
+            f'https://{request.get_host()}'
+            f'{reverse("short_link", args=(short_link,))}'
+        )})
 
-    @action(detail=False, permission_classes=[IsAuthenticated])
+    @action(
+        detail=False, permission_classes=[IsAuthenticated],
+        renderer_classes=SHOPPING_LIST_RENDERERS
+    )
     def download_shopping_cart(self, request):
-        """Метод для скачивания списка покупок текущего пользователя."""
-        ingredients = Ingredient.objects.filter(
-            in_ir__recipe__cart__user=request.user
+        """
+        Метод для скачивания списка покупок текущего пользователя.
+
+        Формат выбирается параметром format: txt, csv, json или pdf. Список
+        отдаётся потоком, ETag зависит от версий корзины пользователя,
+        рецептов и ингредиентов, поэтому повторное скачивание без изменений
+        вернёт 304.
+        """
+        renderer = request.accepted_renderer
+        etag = quote_etag(md5(json.dumps([
+            renderer.format,
+            get_version(USER_VERSION.format(request.user.id)),
+            get_version(RECIPES_VERSION),
+            get_version(INGREDIENTS_VERSION),
+        ]).encode()).hexdigest())
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return not_modified
+        renderer.prepare()
+        ingredients = ShoppingCartItem.objects.filter(
+            user=request.user
         ).values(
-            'name', 'measurement_unit'
-        ).annotate(quantity=Sum('in_ir__amount'))
-        final_list = ["Список покупок\n"]
-        final_list += [
-            f'{ingredient["name"]} - '
-            f'{ingredient["quantity"]} '
-            f'({ingredient["measurement_unit"]})\n'
-            for ingredient in ingredients
-        ]
-        response = HttpResponse(final_list, content_type='text/plain')
-        response[
-            'Content-Disposition'
-        ] = 'attachment; filename="shopping_list.txt"'
+            name=F('ingredient__name'),
+            measurement_unit=F('ingredient__measurement_unit'),
+            quantity=F('amount'),
+        ).order_by('ingredient__name')
+        response = StreamingHttpResponse(
+            renderer.stream(ingredients.iterator()),
+            content_type=(
+                f'{renderer.media_type}; charset={renderer.charset}'
+                if renderer.charset else renderer.media_type
+            )
+        )
+        response['ETag'] = etag
+        response['Content-Disposition'] = (
+            f'attachment; filename="shopping_list.{renderer.format}"'
+        )
         return response
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
-    """Представление для модели Tag."""
+class TagViewSet(
+    PrerenderedCatalogMixin, ConditionalGetMixin,
+    viewsets.ReadOnlyModelViewSet
+):
+    """
+    Представление для модели Tag.
+
+    Полный список тегов отдаётся заранее отрендеренным.
+    """
 
     http_method_names = ('get', 'post', 'patch', 'delete')
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     pagination_class = None
+    catalog = PrerenderedCatalog(TAGS_VERSION, queryset, serializer_class)
+    query_budget = {'list': 2, 'retrieve': 2}
+
+    @staticmethod
+    def get_data_versions():
+        return TAGS_VERSION,
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(
+    PrerenderedCatalogMixin, ConditionalGetMixin,
+    viewsets.ReadOnlyModelViewSet
+):
     """
     Представление для модели Ingredients.
 
-    Настроена фильтрация с возможностью поиск по частичному вхождению в начале
-    названия ингредиента.
+    Настроен поиск по вхождению в название ингредиента: сначала совпадения с
+    началом названия, затем с началом слова, затем остальные. Полный список
+    ингредиентов отдаётся заранее отрендеренным.
     """
 
     http_method_names = ('get', 'post', 'patch', 'delete')
@@ -144,6 +272,31 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     filterset_class = IngredientFilter
     search_fields = ('^name',)
     pagination_class = None
+    catalog = PrerenderedCatalog(
+        INGREDIENTS_VERSION, queryset, serializer_class
+    )
+    query_budget = {'list': 2, 'retrieve': 2}
+
+    @staticmethod
+    def get_data_versions():
+        return INGREDIENTS_VERSION,
+
+    def filter_queryset(self, queryset):
+        """
+        Поиск по параметру name обслуживается индексом в памяти процесса.
+
+        Параметр limit ограничивает количество найденных ингредиентов.
+        """
+        name = self.request.query_params.get('name')
+        if name is None or self.action != 'list':
+            return super().filter_queryset(queryset)
+        return ingredient_index.search(name, limit=self.get_search_limit())
+
+    def get_search_limit(self):
+        limit = self.request.query_params.get('limit', '')
+        if not limit.isdigit():
+            return None
+        return min(int(limit), INGREDIENT_SEARCH_MAX_LIMIT)
 
 
 class UserViewSet(d_views.UserViewSet):
@@ -155,8 +308,23 @@ class UserViewSet(d_views.UserViewSet):
     """
 
     http_method_names = ('get', 'post', 'put', 'delete')
-    pagination_class = LimitPageNumberPagination
+    pagination_class = LimitKeysetPagination
+    cursor_ordering = ('username', 'id')
     permission_classes = (AllowAny,)
+    query_budget = {'list': 3, 'retrieve': 3, 'me': 2, 'subscriptions': 4}
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action not in ('list', 'retrieve'):
+            return queryset
+        user = self.request.user
+        if user.is_anonymous:
+            return queryset.annotate(
+                is_subscribed=Value(False, output_field=BooleanField())
+            )
+        return queryset.annotate(
+            is_subscribed=Exists(user.following.filter(user=OuterRef('pk')))
+        )
 
     def get_permissions(self):
         if self.action == 'me':
@@ -176,7 +344,8 @@ class UserViewSet(d_views.UserViewSet):
         user = request.user
         if request.method == 'PUT':
             serializers = AvatarSerializer(
-                user, data=request.data, partial=True
+                user, data=request.data, partial=True,
+                context={'request': request}
             )
             serializers.is_valid(raise_exception=True)
             serializers.save()
@@ -191,9 +360,11 @@ class UserViewSet(d_views.UserViewSet):
         methods=['post', 'delete'],
         detail=True, permission_classes=[IsAuthenticated]
     )
+    @transaction.atomic
     def subscribe(self, request, id=None):
         """Метод для добавления и удаления подписки на другого пользователя."""
         current_user = request.user
+        bulk.lock_user(current_user)
         subscription = get_object_or_404(User, id=id)
         subscriptions_user = Subscription.objects.filter(
             user=subscription, subscribe=current_user
@@ -230,6 +401,14 @@ class UserViewSet(d_views.UserViewSet):
             }, status=status.HTTP_400_BAD_REQUEST
         )
 
+    @action(
+        methods=['post', 'delete'], detail=False,
+        url_path='subscribe/bulk', permission_classes=[IsAuthenticated]
+    )
+    def bulk_subscribe(self, request):
+        """Подписывает на нескольких авторов или отписывает от них."""
+        return bulk.manage(request, bulk.change_subscriptions)
+
     @action(
         detail=False, permission_classes=[IsAuthenticated],
         serializer_class=SubscriptionSerializer
@@ -242,21 +421,117 @@ class UserViewSet(d_views.UserViewSet):
         количество которых можно регулировать параметром limit.
         """
         queryset = self.paginate_queryset(
-            User.objects.filter(followers__subscribe=self.request.user)
+            User.objects.filter(
+                followers__subscribe=self.request.user
+            ).annotate(
+                recipes_count=Count('recipe'),
+                is_subscribed=Value(True, output_field=BooleanField()),
+            ).order_by(*self.cursor_ordering)
         )
-        print('queryset', queryset)
+        self.attach_recipes(queryset, request.query_params.get(
+            'recipes_limit'
+        ))
         serializer = self.get_serializer(
             queryset, many=True, context={'request': request}
         )
-        print('serializer', serializer)
         return self.get_paginated_response(serializer.data)
 
+    @staticmethod
+    def attach_recipes(authors, limit):
+        """Подгружает рецепты для страницы авторов одним запросом."""
+        recipes = Recipe.objects.filter(author__in=authors)
+        if limit and limit.isdigit():
+            recipes = recipes.first_per_author(int(limit))
+        recipes_by_author = defaultdict(list)
+        for recipe in recipes:
+            recipes_by_author[recipe.author_id].append(recipe)
+        for author in authors:
+            author.short_recipes = recipes_by_author[author.id]
+
+
+class UploadViewSet(viewsets.ViewSet):
+    """
+    Загрузка изображений для рецептов и аватаров.
+
+    POST с файлом в multipart сразу возвращает токен. POST с размером
+    создаёт загрузку по частям: части отправляются PATCH-запросами с
+    заголовком Upload-Offset, GET возвращает уже загруженный объём для
+    продолжения после обрыва. Токен передаётся в поле image или avatar
+    вместо строки base64.
+    """
+
+    permission_classes = (IsAuthenticated,)
+    parser_classes = (MultiPartParser, JSONParser)
+    lookup_value_regex = '[0-9a-f]{32}'
+
+    @staticmethod
+    def get_data(meta):
+        data = {
+            'id': meta['id'], 'size': meta['size'], 'offset': meta['offset']
+        }
+        if meta['format']:
+            data['token'] = uploads.make_token(meta)
+        return data
+
+    def create(self, request):
+        serializer = UploadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        if 'file' in serializer.validated_data:
+            meta = uploads.save_upload(
+                request.user, serializer.validated_data['file']
+            )
+        else:
+            meta = uploads.create_upload(
+                request.user, serializer.validated_data['size']
+            )
+            meta['offset'] = 0
+        return Response(self.get_data(meta), status=status.HTTP_201_CREATED)
+
+    def retrieve(self, request, pk=None):
+        return Response(self.get_data(uploads.get_upload(request.user, pk)))
+
+    def partial_update(self, request, pk=None):
+        meta = uploads.get_upload(request.user, pk)
+        if not request.META.get('CONTENT_LENGTH'):
+            # Без Content-Length (chunked) DRF не даёт поток тела, и часть
+            # была бы молча пропущена.
+            raise uploads.UploadLengthRequired()
+        try:
+            offset = int(request.headers['Upload-Offset'])
+        except (KeyError, ValueError):
+            raise ValidationError(
+                {'Upload-Offset': 'Нужно указать смещение части'}
+            )
+        return Response(self.get_data(
+            uploads.write_chunk(meta, offset, request.stream)
+        ))
+
+
+@lru_cache(maxsize=SHORT_LINK_CACHE_SIZE)
+def resolve_short_link(short_link):
+    """
+    Возвращает id рецепта по короткой ссылке.
+
+    Сначала проверяется legacy_short_link (уникальный индекс): ссылки,
+    выданные до перехода на коды из первичного ключа, могут совпадать с
+    кодом другого рецепта и должны вести туда же, куда и раньше. Иначе
+    первичный ключ восстанавливается из кода без поиска по столбцу
+    short_link. Найденные коды кэшируются в памяти процесса; промахи не
+    кэшируются, так как выбрасывается исключение. Первичные ключи не
+    переиспользуются, поэтому код удалённого рецепта ведёт на страницу 404
+    фронтенда, а не на чужой рецепт.
+    """
+    recipes = Recipe.objects.values_list('pk', flat=True)
+    recipe_id = recipes.filter(legacy_short_link=short_link).first()
+    if recipe_id is not None:
+        return recipe_id
+    recipe_id = short_links.decode(short_link)
+    if recipe_id is None:
+        raise Http404
+    return get_object_or_404(recipes, pk=recipe_id)
+
 
 def get_recipe_short_link(request, short_link):
     """Перенаправление на основную ссылку."""
-    base_url = request.get_host()
-    if short_link:
-        recipe = get_object_or_404(Recipe, short_link=short_link)
-        return redirect(f'https://{base_url}/recipes/{recipe.pk}')
-    else:
-        raise Http404("Короткая ссылка не существует")
+    recipe_id = resolve_short_link(short_link)
+    return redirect(f'https://{request.get_host()}/recipes/{recipe_id}')
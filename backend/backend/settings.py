@@ -27,12 +27,17 @@ INSTALLED_APPS = [
     'rest_framework.authtoken',
     'django_filters',
     'djoser',
+    'core.apps.CoreConfig',
     'users.apps.UsersConfig',
     'recipes.apps.RecipesConfig',
     'api.apps.ApiConfig',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.ServerTimingMiddleware',
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.ProfilingMiddleware',
+    'core.middleware.QueryInspectionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -84,6 +89,24 @@ def database_selection():
 DATABASES = {'default': database_selection()}
 
 
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'redis': 'django_redis.cache.RedisCache',
+}
+
+
+def cache_selection():
+    backend = os.getenv('CACHE', default='locmem')
+    return {
+        'BACKEND': CACHE_BACKENDS[backend],
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+
+
+CACHES = {'default': cache_selection()}
+
+
 AUTH_USER_MODEL = 'users.User'
 
 
@@ -133,6 +156,42 @@ STATIC_ROOT = BASE_DIR / 'static_backend'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+DEFAULT_FILE_STORAGE = 'core.storage.ContentAddressedStorage'
+
+SHOPPING_LIST_PDF_FONT = os.getenv(
+    'SHOPPING_LIST_PDF_FONT', '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+)
+
+UPLOAD_DIR = os.getenv('UPLOAD_DIR') or os.path.join(BASE_DIR, 'uploads')
+
+SERVER_TIMING_HEADER = os.getenv('SERVER_TIMING_HEADER', 'True') == 'True'
+SLOW_REQUEST_MS = float(os.getenv('SLOW_REQUEST_MS', 500))
+SLOW_REQUEST_TOP_SQL = int(os.getenv('SLOW_REQUEST_TOP_SQL', 5))
+
+METRICS_ALLOWED_IPS = os.getenv(
+    'METRICS_ALLOWED_IPS', '127.0.0.1,::1'
+).split(',')
+
+NPLUSONE_THRESHOLD = int(os.getenv('NPLUSONE_THRESHOLD', 3 if DEBUG else 0))
+
+PROFILE_DIR = os.getenv('PROFILE_DIR') or os.path.join(BASE_DIR, 'profiles')
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', 0))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'core': {
+            'handlers': ['console'],
+            'level': os.getenv('LOG_LEVEL', 'INFO'),
+        },
+    },
+}
+
+IMAGE_WORKERS = int(os.getenv('IMAGE_WORKERS', 2))
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
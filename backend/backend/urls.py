@@ -4,13 +4,15 @@ from django.contrib import admin
 from django.urls import path, include, re_path
 
 from api.views import get_recipe_short_link
+from core.metrics import metrics_view
 
 urlpatterns = [
     path('api/', include('api.urls')),
     path('admin/', admin.site.urls),
+    path('metrics', metrics_view, name='metrics'),
     re_path(
-        r'^s/(?P<short_link>[а-яёА-ЯЁa-z0-9-]+)/$', get_recipe_short_link,
-        name='short_link'
+        r'^s/(?P<short_link>[0-9A-Za-zа-яёА-ЯЁ_-]+)/$',
+        get_recipe_short_link, name='short_link'
     ),
 ]
 
@@ -0,0 +1,42 @@
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+VERSION_KEY = 'version:{}'
+
+
+def get_version(namespace):
+    """
+    Возвращает текущую версию набора данных.
+
+    Начальное значение берётся из текущего времени, чтобы после очистки
+    кэша версия не совпала ни с одной из выданных ранее.
+    """
+    key = VERSION_KEY.format(namespace)
+    version = cache.get(key)
+    if version is None:
+        version = time.time_ns()
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key, version)
+    return version
+
+
+def bump_version(namespace):
+    """Увеличивает версию набора данных после его изменения."""
+    key = VERSION_KEY.format(namespace)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        get_version(namespace)
+        return cache.incr(key)
+
+
+def bump_version_on_commit(namespace):
+    """
+    Увеличивает версию после фиксации текущей транзакции.
+
+    Иначе параллельный запрос мог бы закэшировать ещё не изменённые данные
+    под уже новой версией.
+    """
+    transaction.on_commit(lambda: bump_version(namespace))
@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+LOCMEM_CACHE = 'django.core.cache.backends.locmem.LocMemCache'
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs=None, **kwargs):
+    """
+    Кэш должен быть общим для всех процессов.
+
+    В кэше хранятся версии данных, от которых зависят кэшированные ответы,
+    ETag, каталоги и ключи идемпотентности. В locmem версия, увеличенная
+    одним процессом (воркером gunicorn или командой load_data), не видна
+    остальным, и они продолжают отдавать устаревшие данные.
+    """
+    if settings.CACHES['default']['BACKEND'] != LOCMEM_CACHE:
+        return []
+    return [Error(
+        'Кэш locmem не разделяется между процессами',
+        hint='Задайте CACHE=redis или CACHE=file и CACHE_LOCATION',
+        id='core.E001',
+    )]
@@ -3,7 +3,72 @@ MAX_LENGTH_NAME_TAG = 128
 MAX_LENGTH_UNIT = 64
 MAX_LENGTH_NAME_USER = 150
 MAX_LENGTH_TEXT = 256
-MAX_LENGTH_SHORT_LINK = 200
+SHORT_LINK_LENGTH = 6
+MAX_LENGTH_LEGACY_SHORT_LINK = 200
 
 MIN_TIME = 1
 MIN_COUNT = 1
+
+INGREDIENTS_VERSION = 'ingredients'
+TAGS_VERSION = 'tags'
+RECIPES_VERSION = 'recipes'
+RECIPE_VERSION = 'recipe:{}'
+USERS_VERSION = 'users'
+USER_VERSION = 'user:{}'
+
+INGREDIENT_SEARCH_MAX_LIMIT = 100
+RECIPE_SEARCH_CONFIG = 'russian'
+
+COUNT_CACHE_TIMEOUT = 60
+COUNT_ESTIMATE_THRESHOLD = 100_000
+RESPONSE_CACHE_TIMEOUT = 60 * 60
+
+IMAGE_VARIANTS = {
+    'card': (480, 480),
+    'detail': (1280, 1280),
+    'avatar': (192, 192),
+}
+IMAGE_FORMATS = {
+    'webp': {'quality': 80, 'method': 4},
+    'jpeg': {'quality': 82, 'optimize': True, 'progressive': True},
+}
+IMAGE_VARIANTS_DIR = 'image/variants'
+RECIPE_IMAGE_VARIANTS = ('card', 'detail')
+AVATAR_IMAGE_VARIANTS = ('avatar',)
+
+UPLOAD_MAX_SIZE = 10 * 1024 * 1024
+UPLOAD_MAX_DIMENSION = 8000
+UPLOAD_FORMATS = ('JPEG', 'PNG', 'WEBP', 'GIF')
+UPLOAD_CHUNK_SIZE = 64 * 1024
+UPLOAD_MAX_AGE = 60 * 60 * 24
+UPLOAD_TOKEN_SALT = 'core.uploads'
+
+BULK_MAX_ITEMS = 100
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+IDEMPOTENCY_KEY_TIMEOUT = 60 * 60 * 24
+
+LOAD_DATA_BATCH_SIZE = 5000
+
+GENERATE_DATA_BATCH_SIZE = 1000
+GENERATE_DATA_PASSWORD = 'generated-password'
+GENERATE_DATA_SKEW = 1.1
+
+SLOW_REQUEST_SQL_LENGTH = 1000
+
+NPLUSONE_TEST_THRESHOLD = 3
+
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+PROFILE_SAMPLE_INTERVAL = 0.005
+PROFILE_TOP_FUNCTIONS = 15
+
+METRICS_LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10
+)
+METRICS_QUERIES_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+METRICS_SIZE_BUCKETS = tuple(256 * 4 ** power for power in range(8))
+
+MEDIA_CLEAN_DIRS = ('image',)
+MEDIA_CLEAN_MIN_AGE = 60 * 24
+
+SHORT_LINK_MULTIPLIER = 35_104_476_157
+SHORT_LINK_CACHE_SIZE = 10_000
@@ -4,13 +4,27 @@ import uuid
 from django.core.files.base import ContentFile
 from rest_framework import serializers
 
+from core.images import get_variant_name, needs_variants, variants_field
+from core.uploads import check_image, open_upload
+
 
 class Base64ImageField(serializers.ImageField):
-    """Сериализатор для отправки изображенией в JSON формате"""
+    """
+    Сериализатор для отправки изображенией в JSON формате.
+
+    Кроме строки base64 принимает токен, выданный /api/uploads/ текущему
+    пользователю.
+    """
 
     def to_internal_value(self, data):
+        if isinstance(data, str) and data and not data.startswith(
+            'data:image'
+        ):
+            return super().to_internal_value(
+                open_upload(self.context['request'].user, data)
+            )
         try:
-            if isinstance(data, str) and data.startswith('data:image'):
+            if isinstance(data, str):
                 format, imgstr = data.split(';base64,')
                 ext = format.split('/')[-1]
                 data = ContentFile(
@@ -20,4 +34,60 @@ class Base64ImageField(serializers.ImageField):
             raise serializers.ValidationError(
                 'Ошибки валидации в стандартном формате DRF'
             )
+        if isinstance(data, ContentFile):
+            check_image(data)
         return super().to_internal_value(data)
+
+
+class ImageVariantField(serializers.ReadOnlyField):
+    """
+    Ссылка на уменьшенную копию изображения.
+
+    Пока копия не построена, отдаётся ссылка на оригинал. Для сериализатора
+    в списке можно указать отдельную копию через list_variant.
+    """
+
+    def __init__(self, variant, image_field='image', list_variant=None,
+                 image_format='jpeg', **kwargs):
+        kwargs.setdefault('source', '*')
+        super().__init__(**kwargs)
+        self.variant = variant
+        self.list_variant = list_variant or variant
+        self.image_field = image_field
+        self.image_format = image_format
+
+    def get_url(self, image, name):
+        url = image.storage.url(name) if name else image.url
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+    def to_representation(self, instance):
+        image = getattr(instance, self.image_field)
+        if not image:
+            return None
+        in_list = isinstance(
+            getattr(self.parent, 'parent', None), serializers.ListSerializer
+        )
+        return self.get_url(image, get_variant_name(
+            instance, self.image_field,
+            self.list_variant if in_list else self.variant, self.image_format
+        ))
+
+
+class ImageVariantsField(ImageVariantField):
+    """Ссылки на все готовые копии изображения по размерам и форматам."""
+
+    def __init__(self, image_field='image', **kwargs):
+        super().__init__(None, image_field=image_field, **kwargs)
+
+    def to_representation(self, instance):
+        image = getattr(instance, self.image_field)
+        if not image or needs_variants(instance, self.image_field):
+            return None
+        variants = getattr(instance, variants_field(self.image_field))
+        return {
+            variant: {
+                image_format: self.get_url(image, name)
+                for image_format, name in formats.items()
+            } for variant, formats in variants.items() if variant != 'source'
+        }
@@ -0,0 +1,64 @@
+import json
+from hashlib import md5
+
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from core.constants import IDEMPOTENCY_KEY_MAX_LENGTH, IDEMPOTENCY_KEY_TIMEOUT
+
+IDEMPOTENCY_KEY = 'idempotency:{}:{}'
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+
+
+def get_cache_key(request):
+    """Ключ кэша для заголовка Idempotency-Key текущего пользователя."""
+    key = request.headers.get(IDEMPOTENCY_HEADER)
+    if not key:
+        return None
+    if len(key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+        raise ValidationError({IDEMPOTENCY_HEADER: (
+            f'Длина ключа больше {IDEMPOTENCY_KEY_MAX_LENGTH} символов'
+        )})
+    return IDEMPOTENCY_KEY.format(
+        request.user.pk, md5(key.encode()).hexdigest()
+    )
+
+
+def get_fingerprint(request):
+    return md5(json.dumps(
+        [request.method, request.path, request.data], sort_keys=True
+    ).encode()).hexdigest()
+
+
+def replay(request, cache_key):
+    """
+    Повторяет сохранённый ответ на запрос с тем же ключом.
+
+    Если ключ уже использован для другого запроса, возвращается 422.
+    """
+    stored = cache.get(cache_key)
+    if stored is None:
+        return None
+    if stored['fingerprint'] != get_fingerprint(request):
+        return Response(
+            {'errors': 'Ключ идемпотентности использован для другого запроса'},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+    response = Response(stored['data'], status=stored['status'])
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def remember(request, cache_key, response):
+    """Сохраняет ответ после фиксации транзакции."""
+    stored = {
+        'fingerprint': get_fingerprint(request),
+        'data': response.data,
+        'status': response.status_code,
+    }
+    transaction.on_commit(
+        lambda: cache.set(cache_key, stored, IDEMPOTENCY_KEY_TIMEOUT)
+    )
@@ -0,0 +1,143 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from io import BytesIO
+from pathlib import PurePosixPath
+from threading import Lock
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections, transaction
+from PIL import Image, ImageOps
+
+from core.constants import IMAGE_FORMATS, IMAGE_VARIANTS, IMAGE_VARIANTS_DIR
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = Lock()
+
+
+def get_executor():
+    """Пул потоков процесса для обработки изображений."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.IMAGE_WORKERS,
+                    thread_name_prefix='images'
+                )
+    return _executor
+
+
+def variants_field(field_name):
+    return f'{field_name}_variants'
+
+
+def needs_variants(instance, field_name):
+    """Проверяет, что копии не построены для текущего файла поля."""
+    image = getattr(instance, field_name)
+    variants = getattr(instance, variants_field(field_name)) or {}
+    return bool(image) and variants.get('source') != image.name
+
+
+def schedule_variants(instance, field_name, variants):
+    """
+    Ставит построение уменьшенных копий в очередь после коммита.
+
+    Запрос только сохраняет исходный файл, перекодирование выполняется в
+    пуле потоков и не задерживает ответ.
+    """
+    if not needs_variants(instance, field_name):
+        return
+    transaction.on_commit(partial(
+        get_executor().submit, run_build_variants, instance._meta.label,
+        instance.pk, field_name, getattr(instance, field_name).name, variants
+    ))
+
+
+def run_build_variants(*args):
+    try:
+        build_variants(*args)
+    except Exception:
+        logger.exception('Не удалось обработать изображение %s', args)
+    finally:
+        connections.close_all()
+
+
+def build_variants(model_label, pk, field_name, name, variants):
+    """
+    Строит копии изображения и сохраняет их пути в поле *_variants.
+
+    Если пока шла обработка файл поля заменили, результат отбрасывается:
+    копии для нового файла построит его собственная задача.
+    """
+    model = apps.get_model(model_label)
+    storage = model._meta.get_field(field_name).storage
+    result = render_variants(storage, name, variants)
+    with transaction.atomic():
+        instance = model.objects.select_for_update().filter(
+            pk=pk, **{field_name: name}
+        ).first()
+        if instance is None:
+            return
+        setattr(instance, variants_field(field_name), result)
+        instance.save(update_fields=(variants_field(field_name),))
+
+
+def open_image(storage, name):
+    """Открывает изображение с учётом ориентации и без метаданных."""
+    with storage.open(name) as file, Image.open(file) as image:
+        image = ImageOps.exif_transpose(image)
+        has_alpha = (
+            image.mode in ('RGBA', 'LA', 'PA')
+            or 'transparency' in image.info
+        )
+        return image.convert('RGBA' if has_alpha else 'RGB')
+
+
+def encode(image, image_format):
+    """Кодирует изображение; метаданные исходного файла не переносятся."""
+    if image_format == 'jpeg' and image.mode == 'RGBA':
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        image = background
+    buffer = BytesIO()
+    image.save(buffer, image_format.upper(), **IMAGE_FORMATS[image_format])
+    return buffer.getvalue()
+
+
+def render_variants(storage, name, variants):
+    image = open_image(storage, name)
+    stem = PurePosixPath(name).stem
+    result = {'source': name}
+    for variant in variants:
+        copy = image.copy()
+        copy.thumbnail(IMAGE_VARIANTS[variant], Image.LANCZOS)
+        result[variant] = {
+            image_format: storage.save(
+                f'{IMAGE_VARIANTS_DIR}/{stem}-{variant}.{image_format}',
+                ContentFile(encode(copy, image_format))
+            ) for image_format in IMAGE_FORMATS
+        }
+    return result
+
+
+def get_variant_name(instance, field_name, variant, image_format):
+    """Путь к готовой копии или None, если её ещё нет."""
+    if needs_variants(instance, field_name):
+        return None
+    variants = getattr(instance, variants_field(field_name)) or {}
+    return variants.get(variant, {}).get(image_format)
+
+
+def get_variant_names(variants):
+    """Все пути к копиям из значения поля *_variants."""
+    return {
+        name
+        for variant, formats in (variants or {}).items()
+        if variant != 'source'
+        for name in formats.values()
+    }
@@ -0,0 +1,95 @@
+import os
+from ipaddress import ip_address, ip_network
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram,
+    generate_latest, multiprocess
+)
+
+from core.constants import (
+    METRICS_LATENCY_BUCKETS, METRICS_QUERIES_BUCKETS, METRICS_SIZE_BUCKETS
+)
+
+LABELS = ('view', 'action', 'method')
+
+REQUESTS = Counter(
+    'http_requests', 'Количество запросов', LABELS + ('status',)
+)
+LATENCY = Histogram(
+    'http_request_duration_seconds', 'Время ответа', LABELS,
+    buckets=METRICS_LATENCY_BUCKETS
+)
+QUERIES = Histogram(
+    'http_request_db_queries', 'Число запросов к БД', LABELS,
+    buckets=METRICS_QUERIES_BUCKETS
+)
+RESPONSE_SIZE = Histogram(
+    'http_response_size_bytes', 'Размер тела ответа', LABELS,
+    buckets=METRICS_SIZE_BUCKETS
+)
+
+
+def get_registry():
+    """
+    Реестр для выдачи метрик.
+
+    Если задан PROMETHEUS_MULTIPROC_DIR, значения собираются из файлов всех
+    процессов gunicorn, иначе берутся из памяти текущего процесса.
+    """
+    if 'PROMETHEUS_MULTIPROC_DIR' not in os.environ:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def get_action(view_func, method):
+    """Действие вьюсета (list, favorite, ...) или имя функции-представления."""
+    actions = getattr(view_func, 'actions', None)
+    if actions:
+        return actions.get(method.lower(), 'unknown')
+    return getattr(view_func, '__name__', 'unknown')
+
+
+def observe(request, response, duration):
+    labels = (
+        getattr(request, 'metrics_view', 'unmatched'),
+        getattr(request, 'metrics_action', 'unmatched'),
+        request.method,
+    )
+    REQUESTS.labels(*labels, response.status_code).inc()
+    LATENCY.labels(*labels).observe(duration)
+    timing = getattr(request, 'timing', None)
+    if timing is not None:
+        QUERIES.labels(*labels).observe(len(timing.queries))
+    if not response.streaming:
+        RESPONSE_SIZE.labels(*labels).observe(len(response.content))
+
+
+def is_metrics_client(request):
+    """
+    Адрес клиента входит в METRICS_ALLOWED_IPS.
+
+    Метрики отдаются самим Django без аутентификации, поэтому доступ
+    ограничен списком адресов и подсетей сборщика. nginx /metrics не
+    проксирует, и REMOTE_ADDR — адрес того, кто подключился к порту
+    приложения напрямую.
+    """
+    try:
+        address = ip_address(request.META.get('REMOTE_ADDR', ''))
+    except ValueError:
+        return False
+    return any(
+        address in ip_network(network.strip(), strict=False)
+        for network in settings.METRICS_ALLOWED_IPS if network.strip()
+    )
+
+
+def metrics_view(request):
+    if not is_metrics_client(request):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        generate_latest(get_registry()), content_type=CONTENT_TYPE_LATEST
+    )
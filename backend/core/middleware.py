@@ -0,0 +1,189 @@
+import json
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from core import metrics, profiling
+from core.constants import SLOW_REQUEST_SQL_LENGTH
+from core.queries import QueryRecorder, get_query_budget
+
+logger = logging.getLogger(__name__)
+
+
+class RequestTiming:
+    """
+    Замеры одного запроса.
+
+    Экземпляр подключается как execute_wrapper ко всем соединениям с БД и
+    запоминает длительность и текст каждого SQL-запроса.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.view_start = None
+        self.view_end = None
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((time.perf_counter() - start, sql))
+
+    def get_metrics(self, end):
+        view_start = self.view_start or self.start
+        view_end = self.view_end or end
+        return {
+            'db': sum(duration for duration, _ in self.queries) * 1000,
+            'view': (view_end - view_start) * 1000,
+            'render': (end - view_end) * 1000,
+            'total': (end - self.start) * 1000,
+        }
+
+    def get_top_queries(self, count):
+        return [
+            {
+                'ms': round(duration * 1000, 2),
+                'sql': sql[:SLOW_REQUEST_SQL_LENGTH],
+            }
+            for duration, sql in sorted(self.queries, reverse=True)[:count]
+        ]
+
+
+class ServerTimingMiddleware:
+    """
+    Замеряет время запроса к БД, представления и рендеринга ответа.
+
+    Результат отдаётся в заголовке Server-Timing и пишется в лог строкой
+    JSON. Для запросов дольше SLOW_REQUEST_MS в лог добавляются самые
+    долгие SQL-запросы. Тело потоковых ответов формируется уже после
+    middleware и в замеры не попадает.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timing = request.timing = RequestTiming()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timing))
+            response = self.get_response(request)
+        metrics = timing.get_metrics(time.perf_counter())
+        if settings.SERVER_TIMING_HEADER:
+            timings = [
+                f'db;dur={metrics["db"]:.2f};'
+                f'desc="{len(timing.queries)} queries"'
+            ]
+            timings += [
+                f'{name};dur={metrics[name]:.2f}'
+                for name in ('view', 'render', 'total')
+            ]
+            response['Server-Timing'] = ', '.join(timings)
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': len(timing.queries),
+            **{
+                f'{name}_ms': round(value, 2)
+                for name, value in metrics.items()
+            },
+        }
+        if metrics['total'] >= settings.SLOW_REQUEST_MS:
+            record['top_sql'] = timing.get_top_queries(
+                settings.SLOW_REQUEST_TOP_SQL
+            )
+            logger.warning(json.dumps(record, ensure_ascii=False))
+        else:
+            logger.info(json.dumps(record, ensure_ascii=False))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.timing.view_start = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        request.timing.view_end = time.perf_counter()
+        return response
+
+
+class MetricsMiddleware:
+    """
+    Собирает метрики Prometheus по представлению и действию вьюсета.
+
+    Подключается после ServerTimingMiddleware, чтобы брать из request.timing
+    число запросов к БД.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        response = self.get_response(request)
+        metrics.observe(request, response, time.perf_counter() - start)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.metrics_view = request.resolver_match.view_name
+        request.metrics_action = metrics.get_action(view_func, request.method)
+
+
+class ProfilingMiddleware:
+    """
+    Профилирование отдельных запросов по требованию.
+
+    Запрос профилируется, если сотрудник передал заголовок X-Profile, или
+    случайно с вероятностью PROFILE_SAMPLE_RATE.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if profiling.should_profile(request):
+            return profiling.profile(request, self.get_response)
+        return self.get_response(request)
+
+
+class QueryInspectionMiddleware:
+    """
+    Поиск N+1 в режиме разработки.
+
+    Включается настройкой NPLUSONE_THRESHOLD. Пишет в лог формы SQL,
+    повторившиеся за запрос не меньше NPLUSONE_THRESHOLD раз, с местами
+    вызова в коде проекта, а также превышение бюджета query_budget вьюсета.
+    """
+
+    def __init__(self, get_response):
+        if not settings.NPLUSONE_THRESHOLD:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        record = {'method': request.method, 'path': request.path}
+        repeated = recorder.get_repeated(settings.NPLUSONE_THRESHOLD)
+        if repeated:
+            logger.warning(json.dumps(
+                {**record, 'repeated': repeated}, ensure_ascii=False
+            ))
+        budget = getattr(request, 'query_budget', None)
+        if budget is not None and recorder.count > budget:
+            logger.warning(json.dumps(
+                {**record, 'queries': recorder.count, 'budget': budget},
+                ensure_ascii=False
+            ))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.query_budget = get_query_budget(view_func, request.method)
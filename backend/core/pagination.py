@@ -1,5 +1,282 @@
-from rest_framework.pagination import PageNumberPagination
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+from functools import reduce
+from hashlib import md5
+from operator import or_
+
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (
+    BasePagination, PageNumberPagination, _positive_int
+)
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+from core.cache import get_version
+from core.constants import COUNT_CACHE_TIMEOUT, COUNT_ESTIMATE_THRESHOLD
+
+ESTIMATE_SQL = (
+    'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass'
+)
 
 
 class LimitPageNumberPagination(PageNumberPagination):
     page_size_query_param = 'limit'
+
+
+class CachedCountPaginator(Paginator):
+    """Пагинатор, который берёт количество записей у CachedCountPagination."""
+
+    def __init__(self, *args, pagination, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pagination = pagination
+
+    @cached_property
+    def count(self):
+        return self.pagination.get_count(self.object_list)
+
+
+class CachedCountPagination(LimitPageNumberPagination):
+    """
+    Пагинация по номеру страницы с кэшированием общего количества записей.
+
+    Количество кэшируется на короткое время по нормализованному набору
+    параметров запроса и версиям данных, которые возвращает метод
+    представления get_count_versions(); изменение данных меняет версию и
+    тем самым ключ кэша. Для авторизованного пользователя в ключ входит
+    его id: фильтры вроде is_favorited зависят от того, кто спрашивает.
+    Для запроса без условий к большой таблице PostgreSQL используется
+    оценка планировщика из pg_class.reltuples.
+    Признак count_exact в ответе показывает, точное ли количество.
+    """
+
+    ignored_query_params = ('page', 'limit', 'cursor')
+
+    def django_paginator_class(self, object_list, per_page):
+        return CachedCountPaginator(object_list, per_page, pagination=self)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count_key = self.get_count_key(request, view)
+        self.count_exact = True
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_count_key(self, request, view):
+        if not hasattr(view, 'get_count_versions'):
+            return None
+        params = sorted(
+            (name, sorted(request.query_params.getlist(name)))
+            for name in request.query_params
+            if name not in self.ignored_query_params
+        )
+        versions = [get_version(name) for name in view.get_count_versions()]
+        parts = [request.path, params, versions]
+        if request.user.is_authenticated:
+            parts.append(request.user.pk)
+        key = json.dumps(parts)
+        return f'count:{md5(key.encode()).hexdigest()}'
+
+    def get_count(self, queryset):
+        estimate = self.get_estimated_count(queryset)
+        if estimate is not None:
+            self.count_exact = False
+            return estimate
+        if self.count_key is None:
+            return queryset.count()
+        count = cache.get(self.count_key)
+        if count is None:
+            count = queryset.count()
+            cache.set(self.count_key, count, COUNT_CACHE_TIMEOUT)
+        return count
+
+    @staticmethod
+    def get_estimated_count(queryset):
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql' or queryset.query.where:
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(ESTIMATE_SQL, [queryset.model._meta.db_table])
+            row = cursor.fetchone()
+        if row is None or row[0] < COUNT_ESTIMATE_THRESHOLD:
+            return None
+        return row[0]
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        response.data['count_exact'] = self.count_exact
+        return response
+
+
+class KeysetPagination(BasePagination):
+    """
+    Пагинация по ключу сортировки без OFFSET и COUNT.
+
+    Курсор хранит значения полей сортировки последней (или первой) записи
+    страницы, следующая страница выбирается условием по этим значениям,
+    поэтому время ответа не зависит от глубины. Поля сортировки берутся из
+    атрибута представления cursor_ordering и должны однозначно упорядочивать
+    записи.
+    """
+
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'limit'
+    page_size = api_settings.PAGE_SIZE
+    ordering = ('-pub_date', '-id')
+    invalid_cursor_message = 'Неверный курсор'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        self.ordering = getattr(view, 'cursor_ordering', self.ordering)
+        self.base_url = request.build_absolute_uri()
+        self.model = queryset.model
+        reverse, position = self.decode_cursor(request)
+
+        ordering = self.ordering
+        if reverse:
+            ordering = [self.invert(field) for field in ordering]
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.after(ordering, position))
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+            has_next, has_previous = position is not None, has_more
+        else:
+            has_next, has_previous = has_more, position is not None
+        self.next_position = (
+            self.get_position(results[-1]) if has_next and results else None
+        )
+        self.previous_position = (
+            self.get_position(results[0])
+            if has_previous and results else None
+        )
+        return results
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+    @staticmethod
+    def invert(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    def after(self, ordering, position):
+        """Условие 'запись идёт после position' для заданной сортировки."""
+        conditions = []
+        for index, field in enumerate(ordering):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            equal = {
+                previous.lstrip('-'): position[previous.lstrip('-')]
+                for previous in ordering[:index]
+            }
+            conditions.append(
+                Q(**equal, **{f'{name}__{lookup}': position[name]})
+            )
+        return reduce(or_, conditions)
+
+    def get_position(self, instance):
+        return [
+            self.model._meta.get_field(field.lstrip('-')).value_to_string(
+                instance
+            ) for field in self.ordering
+        ]
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return False, None
+        try:
+            cursor = json.loads(urlsafe_b64decode(encoded.encode('ascii')))
+            values = cursor['p']
+            if len(values) != len(self.ordering):
+                raise ValueError
+            position = {}
+            for field, value in zip(self.ordering, values):
+                name = field.lstrip('-')
+                position[name] = self.model._meta.get_field(name).to_python(
+                    value
+                )
+            return bool(cursor.get('r')), position
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, position, reverse):
+        cursor = {'p': position}
+        if reverse:
+            cursor['r'] = 1
+        encoded = urlsafe_b64encode(json.dumps(cursor).encode()).decode()
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, encoded
+        )
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return self.encode_cursor(self.next_position, reverse=False)
+
+    def get_previous_link(self):
+        if self.previous_position is None:
+            return None
+        return self.encode_cursor(self.previous_position, reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+
+class LimitKeysetPagination(CachedCountPagination):
+    """
+    Постраничная пагинация с переходом на курсор по запросу клиента.
+
+    Если в запросе передан параметр cursor (для первой страницы — пустой),
+    используется KeysetPagination, иначе — пагинация по номеру страницы.
+    Курсор хранит только значения полей модели, поэтому выборка,
+    отсортированная по аннотации (например, по релевантности поиска),
+    всегда листается по номеру страницы, чтобы не потерять её порядок.
+    """
+
+    keyset_pagination_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        cursor_param = self.keyset_pagination_class.cursor_query_param
+        if (
+            cursor_param not in request.query_params
+            or not self.is_ordered_by_fields(queryset)
+        ):
+            return super().paginate_queryset(queryset, request, view)
+        self.keyset = self.keyset_pagination_class()
+        return self.keyset.paginate_queryset(queryset, request, view)
+
+    @staticmethod
+    def is_ordered_by_fields(queryset):
+        names = {
+            name for field in queryset.model._meta.concrete_fields
+            for name in (field.name, field.attname)
+        }
+        return all(
+            isinstance(field, str) and field.lstrip('-') in names
+            for field in queryset.query.order_by
+        )
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
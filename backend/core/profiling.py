@@ -0,0 +1,109 @@
+import cProfile
+import os
+import random
+import re
+import sys
+import threading
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from core.constants import PROFILE_HEADER, PROFILE_SAMPLE_INTERVAL
+
+
+class StackSampler:
+    """
+    Сэмплирующий профилировщик одного потока.
+
+    Фоновый поток с интервалом PROFILE_SAMPLE_INTERVAL снимает стек
+    профилируемого потока и считает одинаковые стеки; результат
+    записывается в формате collapsed stacks для построения flame graph.
+    """
+
+    def __init__(self, thread_id, interval=PROFILE_SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopped.set()
+        self.thread.join()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[self.collapse(frame)] += 1
+
+    @staticmethod
+    def collapse(frame):
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(
+                f'{code.co_name} '
+                f'({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+            )
+            frame = frame.f_back
+        return ';'.join(reversed(names))
+
+    def dump(self, path):
+        with open(path, 'w', encoding='utf-8') as file:
+            for stack, count in self.stacks.most_common():
+                file.write(f'{stack} {count}\n')
+
+
+def is_staff(request):
+    """Проверка сотрудника с помощью аутентификации DRF (по токену)."""
+    user = Request(request, authenticators=[
+        authentication() for authentication
+        in api_settings.DEFAULT_AUTHENTICATION_CLASSES
+    ]).user
+    return user.is_authenticated and user.is_staff
+
+
+def should_profile(request):
+    if PROFILE_HEADER in request.META:
+        return is_staff(request)
+    return random.random() < settings.PROFILE_SAMPLE_RATE
+
+
+def get_profile_name(request):
+    path = re.sub(r'[^0-9A-Za-z]+', '-', request.path).strip('-')
+    return (
+        f'{timezone.now():%Y%m%dT%H%M%S}-{request.method}-{path or "root"}'
+        f'-{uuid.uuid4().hex[:8]}'
+    )
+
+
+def profile(request, get_response):
+    """
+    Выполняет запрос под cProfile и сэмплирующим профилировщиком.
+
+    В PROFILE_DIR сохраняются файлы <имя>.prof и <имя>.collapsed, имя
+    возвращается в заголовке X-Profile-Id.
+    """
+    profiler = cProfile.Profile()
+    with StackSampler(threading.get_ident()) as sampler:
+        profiler.enable()
+        try:
+            response = get_response(request)
+        finally:
+            profiler.disable()
+    name = get_profile_name(request)
+    os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+    path = os.path.join(settings.PROFILE_DIR, name)
+    profiler.dump_stats(f'{path}.prof')
+    sampler.dump(f'{path}.collapsed')
+    response['X-Profile-Id'] = name
+    return response
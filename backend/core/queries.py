@@ -0,0 +1,98 @@
+import os
+import re
+import traceback
+from collections import defaultdict
+
+from django.conf import settings
+
+IN_LIST_RE = re.compile(r'\bIN\s*\((?:\s*%s\s*,?)+\)', re.IGNORECASE)
+NUMBER_RE = re.compile(r'\b\d+\b')
+STRING_RE = re.compile(r"'(?:[^']|'')*'")
+SPACES_RE = re.compile(r'\s+')
+CORE_DIR = os.path.dirname(__file__)
+SKIP_FILES = {
+    os.path.join(CORE_DIR, name)
+    for name in ('queries.py', 'middleware.py', 'profiling.py')
+}
+
+
+def fingerprint(sql):
+    """
+    Форма SQL-запроса без конкретных значений.
+
+    Литералы заменяются на '?', списки IN любой длины — на IN (...), так
+    что запросы, отличающиеся только параметрами, совпадают.
+    """
+    sql = STRING_RE.sub('?', sql)
+    sql = IN_LIST_RE.sub('IN (...)', sql)
+    sql = NUMBER_RE.sub('?', sql)
+    return SPACES_RE.sub(' ', sql).strip()
+
+
+def get_call_site():
+    """Ближайший к запросу кадр стека из кода проекта: файл, строка, код."""
+    base_dir = str(settings.BASE_DIR)
+    for frame in reversed(traceback.extract_stack()):
+        filename = frame.filename
+        if (
+            filename.startswith(base_dir)
+            and 'site-packages' not in filename
+            and filename not in SKIP_FILES
+        ):
+            path = os.path.relpath(filename, base_dir)
+            return f'{path}:{frame.lineno} {frame.line}'
+    return 'unknown'
+
+
+class QueryRecorder:
+    """
+    Группирует SQL-запросы по форме и запоминает места их вызова.
+
+    Подключается как execute_wrapper к соединению с БД.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.shapes = defaultdict(int)
+        self.call_sites = defaultdict(set)
+
+    def __call__(self, execute, sql, params, many, context):
+        shape = fingerprint(sql)
+        self.count += 1
+        self.shapes[shape] += 1
+        self.call_sites[shape].add(get_call_site())
+        return execute(sql, params, many, context)
+
+    def get_repeated(self, threshold):
+        """Формы запросов, выполненные не меньше threshold раз."""
+        return [
+            {
+                'count': count,
+                'sql': shape,
+                'call_sites': sorted(self.call_sites[shape]),
+            }
+            for shape, count in sorted(
+                self.shapes.items(), key=lambda item: -item[1]
+            ) if count >= threshold
+        ]
+
+    def report(self, threshold=2):
+        lines = [f'Всего запросов: {self.count}']
+        for item in self.get_repeated(threshold):
+            lines.append(f'{item["count"]} x {item["sql"]}')
+            lines.extend(f'    {site}' for site in item['call_sites'])
+        return '\n'.join(lines)
+
+
+def get_query_budget(view_func, method):
+    """
+    Заявленный бюджет запросов к БД для действия вьюсета.
+
+    Бюджет задаётся во вьюсете словарём query_budget {действие: число} и
+    учитывает запрос аутентификации по токену.
+    """
+    budget = getattr(getattr(view_func, 'cls', None), 'query_budget', None)
+    actions = getattr(view_func, 'actions', None)
+    if not budget or not actions:
+        return None
+    return budget.get(actions.get(method.lower()))
@@ -0,0 +1,39 @@
+from string import ascii_letters, digits
+
+from core.constants import SHORT_LINK_LENGTH, SHORT_LINK_MULTIPLIER
+
+ALPHABET = digits + ascii_letters
+BASE = len(ALPHABET)
+CAPACITY = BASE ** SHORT_LINK_LENGTH
+INVERSE_MULTIPLIER = pow(SHORT_LINK_MULTIPLIER, -1, CAPACITY)
+
+
+def encode(number):
+    """
+    Возвращает короткий код фиксированной длины для числа.
+
+    Число перемешивается умножением на взаимно простой с ёмкостью
+    множитель, поэтому соседние идентификаторы дают непохожие коды, а
+    преобразование остаётся взаимно однозначным.
+    """
+    if not 0 <= number < CAPACITY:
+        raise ValueError(f'Число {number} не помещается в короткий код')
+    number = number * SHORT_LINK_MULTIPLIER % CAPACITY
+    code = []
+    for _ in range(SHORT_LINK_LENGTH):
+        number, index = divmod(number, BASE)
+        code.append(ALPHABET[index])
+    return ''.join(reversed(code))
+
+
+def decode(code):
+    """Возвращает число по короткому коду или None для неверного кода."""
+    if len(code) != SHORT_LINK_LENGTH:
+        return None
+    number = 0
+    for char in code:
+        index = ALPHABET.find(char)
+        if index < 0:
+            return None
+        number = number * BASE + index
+    return number * INVERSE_MULTIPLIER % CAPACITY
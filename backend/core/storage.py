@@ -0,0 +1,48 @@
+import hashlib
+import os
+import posixpath
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+from core.constants import UPLOAD_CHUNK_SIZE
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Хранилище, которое называет файлы по SHA-256 содержимого.
+
+    Повторная загрузка той же картинки не создаёт новый файл, а возвращает
+    имя уже сохранённого. Файл с таким именем никогда не перезаписывается,
+    поэтому его можно отдавать с неизменяемыми заголовками кэширования.
+    Удалением файлов, на которые больше нет ссылок, занимается команда
+    clean_media. Она не трогает свежие файлы, поэтому при повторной
+    загрузке у существующего файла обновляется время изменения: иначе
+    старый файл без ссылок мог бы быть удалён до того, как новая ссылка
+    на него попадёт в базу.
+    """
+
+    def get_content_name(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks(UPLOAD_CHUNK_SIZE):
+            digest.update(chunk)
+        digest = digest.hexdigest()
+        extension = posixpath.splitext(name)[1].lower()
+        return posixpath.join(
+            posixpath.dirname(name), digest[:2], f'{digest}{extension}'
+        )
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.get_content_name(name, content)
+        if self.exists(name):
+            try:
+                os.utime(self.path(name))
+            except FileNotFoundError:
+                pass
+            else:
+                return name
+        return super().save(name, content, max_length)
@@ -0,0 +1,61 @@
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.urls import resolve
+
+from core.constants import NPLUSONE_TEST_THRESHOLD
+from core.queries import QueryRecorder, get_query_budget
+
+
+@contextmanager
+def query_budget(budget, threshold=NPLUSONE_TEST_THRESHOLD,
+                 using=DEFAULT_DB_ALIAS):
+    """
+    Проверяет, что код внутри блока уложился в budget запросов к БД.
+
+    При превышении бюджета или повторе одной формы запроса не меньше
+    threshold раз выбрасывается AssertionError с отчётом по формам
+    запросов и местам их вызова.
+    """
+    recorder = QueryRecorder()
+    with connections[using].execute_wrapper(recorder):
+        yield recorder
+    problems = []
+    if budget is not None and recorder.count > budget:
+        problems.append(
+            f'Превышен бюджет запросов: {recorder.count} > {budget}'
+        )
+    if threshold and recorder.get_repeated(threshold):
+        problems.append(f'Повторяющиеся запросы (N+1), порог {threshold}')
+    if problems:
+        raise AssertionError(
+            '\n'.join(problems + [recorder.report(threshold or 2)])
+        )
+
+
+class QueryBudgetMixin:
+    """
+    Миксин для TestCase с клиентом DRF.
+
+    assertQueryBudget проверяет произвольный блок кода, assertEndpointBudget
+    запрашивает URL и сверяет число запросов с query_budget вьюсета.
+    """
+
+    nplusone_threshold = NPLUSONE_TEST_THRESHOLD
+
+    def assertQueryBudget(self, budget, threshold=None):
+        return query_budget(
+            budget,
+            self.nplusone_threshold if threshold is None else threshold
+        )
+
+    def assertEndpointBudget(self, url, method='get', **kwargs):
+        budget = get_query_budget(resolve(urlsplit(url).path).func, method)
+        if budget is None:
+            self.fail(f'Для {method.upper()} {url} не задан query_budget')
+        with self.assertQueryBudget(budget):
+            response = getattr(self.client, method)(url, **kwargs)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        return response
@@ -0,0 +1,184 @@
+import fcntl
+import json
+import os
+import time
+import uuid
+
+from django.conf import settings
+from django.core import signing
+from django.core.files.base import ContentFile
+from PIL import Image
+from rest_framework import status
+from rest_framework.exceptions import (
+    APIException, NotFound, ValidationError
+)
+
+from core.constants import (
+    UPLOAD_CHUNK_SIZE, UPLOAD_FORMATS, UPLOAD_MAX_AGE, UPLOAD_MAX_DIMENSION,
+    UPLOAD_TOKEN_SALT
+)
+
+
+class UploadOffsetConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'Смещение не совпадает с уже загруженной частью'
+
+
+class UploadLengthRequired(APIException):
+    status_code = status.HTTP_411_LENGTH_REQUIRED
+    default_detail = 'Для части файла нужен заголовок Content-Length'
+
+
+def get_path(upload_id, suffix=''):
+    return os.path.join(settings.UPLOAD_DIR, f'{upload_id}{suffix}')
+
+
+def check_image(file):
+    """
+    Проверяет формат и размеры изображения до его декодирования.
+
+    Pillow читает только заголовок файла, поэтому слишком большие картинки
+    отклоняются без распаковки пикселей. Возвращает формат изображения.
+    """
+    try:
+        with Image.open(file) as image:
+            width, height = image.size
+            image_format = image.format
+            if image_format not in UPLOAD_FORMATS:
+                raise ValidationError(
+                    f'Формат {image_format} не поддерживается'
+                )
+            if max(width, height) > UPLOAD_MAX_DIMENSION:
+                raise ValidationError(
+                    f'Сторона изображения больше {UPLOAD_MAX_DIMENSION} px'
+                )
+            image.verify()
+    except (OSError, SyntaxError, Image.DecompressionBombError):
+        raise ValidationError('Файл не является изображением')
+    finally:
+        file.seek(0)
+    return image_format.lower()
+
+
+def remove_expired_uploads():
+    """Удаляет загрузки, срок действия токенов которых истёк."""
+    expired = time.time() - UPLOAD_MAX_AGE
+    with os.scandir(settings.UPLOAD_DIR) as entries:
+        for entry in entries:
+            if entry.is_file() and entry.stat().st_mtime < expired:
+                os.remove(entry.path)
+
+
+def create_upload(user, size):
+    """Создаёт загрузку по частям и возвращает её описание."""
+    os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
+    remove_expired_uploads()
+    upload_id = uuid.uuid4().hex
+    meta = {'id': upload_id, 'user': user.pk, 'size': size, 'format': None}
+    open(get_path(upload_id), 'wb').close()
+    save_meta(meta)
+    return meta
+
+
+def save_meta(meta):
+    with open(get_path(meta['id'], '.json'), 'w') as file:
+        json.dump(meta, file)
+
+
+def get_upload(user, upload_id):
+    try:
+        with open(get_path(upload_id, '.json')) as file:
+            meta = json.load(file)
+    except FileNotFoundError:
+        raise NotFound('Загрузка не найдена')
+    if meta['user'] != user.pk:
+        raise NotFound('Загрузка не найдена')
+    meta['offset'] = os.path.getsize(get_path(upload_id))
+    return meta
+
+
+def write_chunk(meta, offset, stream):
+    """
+    Дописывает часть файла из потока запроса начиная с offset.
+
+    Тело читается блоками и сразу пишется на диск; запись прерывается, как
+    только файл превышает заявленный размер. Проверка смещения и запись
+    выполняются под исключительной блокировкой файла, поэтому из
+    параллельных частей с одинаковым смещением принимается только одна.
+    """
+    with open(get_path(meta['id']), 'ab') as file:
+        fcntl.flock(file, fcntl.LOCK_EX)
+        file.seek(0, os.SEEK_END)
+        if file.tell() != offset:
+            raise UploadOffsetConflict()
+        while True:
+            chunk = stream.read(UPLOAD_CHUNK_SIZE) if stream else b''
+            if not chunk:
+                break
+            if file.tell() + len(chunk) > meta['size']:
+                raise ValidationError('Загружено больше заявленного размера')
+            file.write(chunk)
+        file.flush()
+        meta['offset'] = file.tell()
+        if meta['offset'] == meta['size']:
+            complete_upload(meta)
+    return meta
+
+
+def save_upload(user, uploaded_file):
+    """Сохраняет файл, загруженный целиком, и возвращает его описание."""
+    meta = create_upload(user, uploaded_file.size)
+    with open(get_path(meta['id']), 'wb') as file:
+        for chunk in uploaded_file.chunks(UPLOAD_CHUNK_SIZE):
+            file.write(chunk)
+    meta['offset'] = meta['size']
+    complete_upload(meta)
+    return meta
+
+
+def complete_upload(meta):
+    """Проверяет загруженное изображение, неподходящий файл удаляется."""
+    path = get_path(meta['id'])
+    try:
+        with open(path, 'rb') as file:
+            meta['format'] = check_image(file)
+    except ValidationError:
+        os.remove(path)
+        os.remove(get_path(meta['id'], '.json'))
+        raise
+    save_meta(meta)
+
+
+def make_token(meta):
+    """Подписанный токен завершённой загрузки для полей изображений."""
+    return signing.dumps(
+        {'id': meta['id'], 'user': meta['user']}, salt=UPLOAD_TOKEN_SALT
+    )
+
+
+def open_upload(user, token):
+    """
+    Возвращает файл загрузки по токену текущего пользователя.
+
+    Содержимое читается в память: файл передаётся в ImageField и
+    хранилище, которые его не закрывают. Размер ограничен
+    UPLOAD_MAX_SIZE.
+    """
+    try:
+        data = signing.loads(
+            token, salt=UPLOAD_TOKEN_SALT, max_age=UPLOAD_MAX_AGE
+        )
+    except signing.BadSignature:
+        raise ValidationError('Неверный или просроченный токен загрузки')
+    if data['user'] != user.pk:
+        raise ValidationError('Неверный или просроченный токен загрузки')
+    try:
+        meta = get_upload(user, data['id'])
+    except NotFound:
+        raise ValidationError('Загрузка не найдена')
+    if meta['format'] is None:
+        raise ValidationError('Загрузка не завершена')
+    with open(get_path(meta['id']), 'rb') as file:
+        return ContentFile(
+            file.read(), name=f'{uuid.uuid4()}.{meta["format"]}'
+        )
@@ -0,0 +1,25 @@
+import os
+import shutil
+
+from prometheus_client import multiprocess
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+
+
+def on_starting(server):
+    """
+    Отказывается запускаться с кэшем locmem и очищает файлы метрик,
+    оставшиеся от прошлого запуска.
+    """
+    from core.checks import check_shared_cache
+    for error in check_shared_cache():
+        raise RuntimeError(f'{error.msg}. {error.hint}')
+    path = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path)
+
+
+def child_exit(server, worker):
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        multiprocess.mark_process_dead(worker.pid)
@@ -1,7 +1,8 @@
 from django.contrib import admin
 
 from recipes.models import (
-    Cart, Favorite, Ingredient, IngredientRecipe, Recipe, Tag, TagRecipe
+    Ingredient, IngredientRecipe, Recipe, ShoppingCartItem, Tag, TagRecipe,
+    get_recipe_amounts, lock_recipes
 )
 
 admin.site.empty_value_display = 'Не задано'
@@ -28,6 +29,14 @@ class RecipesAdmin(admin.ModelAdmin):
     def count_favorites(self, obj):
         return obj.in_favorites.count()
 
+    def save_related(self, request, form, formsets, change):
+        lock_recipes([form.instance.pk])
+        old_amounts = get_recipe_amounts(form.instance) if change else {}
+        super().save_related(request, form, formsets, change)
+        ShoppingCartItem.objects.change_recipe(
+            form.instance, old_amounts, get_recipe_amounts(form.instance)
+        )
+
 
 class TagAdmin(admin.ModelAdmin):
     list_display = ('name', 'slug')
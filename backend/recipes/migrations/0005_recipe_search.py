@@ -0,0 +1,66 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+INDEX_NAME = 'recipe_search_vector_idx'
+
+SQLITE_FORWARD = (
+    "CREATE VIRTUAL TABLE recipes_recipe_fts USING fts5("
+    "name, text, content='recipes_recipe', content_rowid='id')",
+    "CREATE TRIGGER recipes_recipe_fts_ai AFTER INSERT ON recipes_recipe "
+    "BEGIN INSERT INTO recipes_recipe_fts(rowid, name, text) "
+    "VALUES (new.id, new.name, new.text); END",
+    "CREATE TRIGGER recipes_recipe_fts_ad AFTER DELETE ON recipes_recipe "
+    "BEGIN INSERT INTO recipes_recipe_fts(recipes_recipe_fts, rowid, name, "
+    "text) VALUES ('delete', old.id, old.name, old.text); END",
+    "CREATE TRIGGER recipes_recipe_fts_au AFTER UPDATE ON recipes_recipe "
+    "BEGIN INSERT INTO recipes_recipe_fts(recipes_recipe_fts, rowid, name, "
+    "text) VALUES ('delete', old.id, old.name, old.text); "
+    "INSERT INTO recipes_recipe_fts(rowid, name, text) "
+    "VALUES (new.id, new.name, new.text); END",
+    "INSERT INTO recipes_recipe_fts(recipes_recipe_fts) VALUES ('rebuild')",
+)
+
+SQLITE_BACKWARD = (
+    'DROP TRIGGER IF EXISTS recipes_recipe_fts_ai',
+    'DROP TRIGGER IF EXISTS recipes_recipe_fts_ad',
+    'DROP TRIGGER IF EXISTS recipes_recipe_fts_au',
+    'DROP TABLE IF EXISTS recipes_recipe_fts',
+)
+
+
+def search_index():
+    return GinIndex(
+        SearchVector('name', 'text', config='russian'), name=INDEX_NAME
+    )
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.add_index(apps.get_model('recipes', 'Recipe'),
+                                search_index())
+    elif vendor == 'sqlite':
+        for statement in SQLITE_FORWARD:
+            schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.remove_index(apps.get_model('recipes', 'Recipe'),
+                                   search_index())
+    elif vendor == 'sqlite':
+        for statement in SQLITE_BACKWARD:
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_alter_ingredientrecipe_ingredient'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
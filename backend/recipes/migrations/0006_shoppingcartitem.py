@@ -0,0 +1,58 @@
+# Generated by Django 3.2.3 on 2026-10-17 04:10
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_shopping_cart_items(apps, schema_editor):
+    """Заполняет списки покупок по уже существующим корзинам."""
+    Cart = apps.get_model('recipes', 'Cart')
+    ShoppingCartItem = apps.get_model('recipes', 'ShoppingCartItem')
+    rows = Cart.objects.order_by().values(
+        'user_id',
+        ingredient_id=models.F('recipe__recipe_ingredient__ingredient')
+    ).annotate(
+        total=models.Sum('recipe__recipe_ingredient__amount')
+    ).filter(ingredient_id__isnull=False)
+    ShoppingCartItem.objects.bulk_create(
+        (
+            ShoppingCartItem(
+                user_id=row['user_id'], ingredient_id=row['ingredient_id'],
+                amount=row['total']
+            ) for row in rows.iterator()
+        ),
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0005_recipe_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShoppingCartItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.PositiveIntegerField(verbose_name='Количество')),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shopping_cart_items', to='recipes.ingredient', verbose_name='Ингредиент')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shopping_cart_items', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Ингредиент в списке покупок',
+                'verbose_name_plural': 'Ингредиенты в списке покупок',
+                'ordering': ('ingredient__name',),
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='shoppingcartitem',
+            constraint=models.UniqueConstraint(fields=('user', 'ingredient'), name='unique_shopping_cart_item'),
+        ),
+        migrations.RunPython(
+            fill_shopping_cart_items, migrations.RunPython.noop
+        ),
+    ]
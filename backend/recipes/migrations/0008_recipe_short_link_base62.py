@@ -0,0 +1,76 @@
+# Generated by Django 3.2.3 on 2026-10-17 04:15
+
+from string import ascii_letters, digits
+
+from django.db import migrations, models
+
+# Копия core.short_links.encode на момент миграции: миграция не должна
+# меняться вместе с кодом приложения.
+ALPHABET = digits + ascii_letters
+LENGTH = 6
+MULTIPLIER = 35_104_476_157
+CAPACITY = len(ALPHABET) ** LENGTH
+
+
+def encode(number):
+    number = number * MULTIPLIER % CAPACITY
+    code = []
+    for _ in range(LENGTH):
+        number, index = divmod(number, len(ALPHABET))
+        code.append(ALPHABET[index])
+    return ''.join(reversed(code))
+
+
+def fill_short_links(apps, schema_editor):
+    """Старые ссылки сохраняются в legacy_short_link и продолжают работать."""
+    Recipe = apps.get_model('recipes', 'Recipe')
+    recipes = list(Recipe.objects.only('pk', 'short_link'))
+    for recipe in recipes:
+        recipe.legacy_short_link = recipe.short_link or None
+        recipe.short_link = None
+    Recipe.objects.bulk_update(
+        recipes, ['legacy_short_link', 'short_link'], batch_size=1000
+    )
+    for recipe in recipes:
+        recipe.short_link = encode(recipe.pk)
+    Recipe.objects.bulk_update(recipes, ['short_link'], batch_size=1000)
+
+
+def restore_short_links(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    recipes = list(
+        Recipe.objects.filter(legacy_short_link__isnull=False)
+        .only('pk', 'legacy_short_link')
+    )
+    Recipe.objects.filter(
+        pk__in=[recipe.pk for recipe in recipes]
+    ).update(short_link=None)
+    for recipe in recipes:
+        recipe.short_link = recipe.legacy_short_link
+    Recipe.objects.bulk_update(recipes, ['short_link'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_shoppingcartitem'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='legacy_short_link',
+            field=models.SlugField(allow_unicode=True, blank=True, editable=False, max_length=200, null=True, unique=True, verbose_name='Старая короткая ссылка'),
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='short_link',
+            field=models.CharField(blank=True, editable=False, max_length=200, null=True, unique=True, verbose_name='Короткая ссылка'),
+        ),
+        migrations.RunPython(fill_short_links, restore_short_links),
+        migrations.AlterField(
+            model_name='recipe',
+            name='short_link',
+            field=models.CharField(blank=True, editable=False, max_length=6, null=True, unique=True, verbose_name='Короткая ссылка'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.3 on 2026-10-17 04:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_recipe_short_link_base62'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_variants',
+            field=models.JSONField(blank=True, editable=False, null=True, verbose_name='Уменьшенные копии картинки'),
+        ),
+    ]
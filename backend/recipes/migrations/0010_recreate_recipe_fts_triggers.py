@@ -0,0 +1,36 @@
+from django.db import migrations
+
+# Перестроение таблицы recipes_recipe в SQLite (0008-0009) удаляет триггеры
+# FTS5 из 0005. SQL скопирован сюда, чтобы миграция не зависела от кода
+# приложения.
+SQLITE_FORWARD = (
+    "CREATE TRIGGER IF NOT EXISTS recipes_recipe_fts_ai AFTER INSERT ON "
+    "recipes_recipe BEGIN INSERT INTO recipes_recipe_fts(rowid, name, text) "
+    "VALUES (new.id, new.name, new.text); END",
+    "CREATE TRIGGER IF NOT EXISTS recipes_recipe_fts_ad AFTER DELETE ON "
+    "recipes_recipe BEGIN INSERT INTO recipes_recipe_fts(recipes_recipe_fts, "
+    "rowid, name, text) VALUES ('delete', old.id, old.name, old.text); END",
+    "CREATE TRIGGER IF NOT EXISTS recipes_recipe_fts_au AFTER UPDATE ON "
+    "recipes_recipe BEGIN INSERT INTO recipes_recipe_fts(recipes_recipe_fts, "
+    "rowid, name, text) VALUES ('delete', old.id, old.name, old.text); "
+    "INSERT INTO recipes_recipe_fts(rowid, name, text) "
+    "VALUES (new.id, new.name, new.text); END",
+    "INSERT INTO recipes_recipe_fts(recipes_recipe_fts) VALUES ('rebuild')",
+)
+
+
+def recreate_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for statement in SQLITE_FORWARD:
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_recipe_image_variants'),
+    ]
+
+    operations = [
+        migrations.RunPython(recreate_triggers, migrations.RunPython.noop),
+    ]
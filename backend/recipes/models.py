@@ -1,12 +1,12 @@
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator
-from django.db import models
-from django.utils.text import slugify
+from django.db import models, transaction
+from django.db.models.functions import RowNumber
 
-from core import validators
+from core import short_links, validators
 from core.constants import (
     MAX_LENGTH_NAME, MAX_LENGTH_TEXT, MAX_LENGTH_UNIT, MIN_TIME, MIN_COUNT,
-    MAX_LENGTH_NAME_TAG, MAX_LENGTH_SHORT_LINK
+    MAX_LENGTH_LEGACY_SHORT_LINK, MAX_LENGTH_NAME_TAG, SHORT_LINK_LENGTH
 )
 
 User = get_user_model()
@@ -57,6 +57,80 @@ class Ingredient(models.Model):
         return self.name[:MAX_LENGTH_NAME]
 
 
+class RecipeQuerySet(models.QuerySet):
+    """Набор запросов для рецептов."""
+
+    def with_user_flags(self, user):
+        """Аннотирует признаки 'в избранном' и 'в списке покупок'."""
+        if user.is_anonymous:
+            return self.annotate(
+                is_favorited=models.Value(
+                    False, output_field=models.BooleanField()
+                ),
+                is_in_shopping_cart=models.Value(
+                    False, output_field=models.BooleanField()
+                ),
+            )
+        return self.annotate(
+            is_favorited=models.Exists(
+                Favorite.objects.filter(
+                    recipe=models.OuterRef('pk'), user=user
+                )
+            ),
+            is_in_shopping_cart=models.Exists(
+                Cart.objects.filter(recipe=models.OuterRef('pk'), user=user)
+            ),
+        )
+
+    def for_read(self, user):
+        """
+        Готовит рецепты к сериализации за фиксированное число запросов.
+
+        Автор подгружается через JOIN, теги и ингредиенты — двумя
+        дополнительными запросами на всю страницу, признаки пользователя и
+        подписка на автора — подзапросами.
+        """
+        queryset = self.select_related('author').prefetch_related(
+            'tags',
+            models.Prefetch(
+                'recipe_ingredient',
+                queryset=IngredientRecipe.objects.select_related('ingredient')
+            ),
+        ).with_user_flags(user)
+        if user.is_anonymous:
+            return queryset.annotate(
+                author_is_subscribed=models.Value(
+                    False, output_field=models.BooleanField()
+                )
+            )
+        return queryset.annotate(
+            author_is_subscribed=models.Exists(
+                user.following.filter(user=models.OuterRef('author'))
+            )
+        )
+
+    def first_per_author(self, limit):
+        """
+        Возвращает не более limit последних рецептов каждого автора.
+
+        Рецепты нумеруются оконной функцией ROW_NUMBER() в разрезе автора,
+        поэтому выборка для всей страницы авторов делается одним запросом.
+        """
+        ranked = self.annotate(
+            author_rank=models.Window(
+                expression=RowNumber(),
+                partition_by=[models.F('author')],
+                order_by=[models.F('pub_date').desc(), models.F('id').desc()]
+            )
+        )
+        sql, params = ranked.query.sql_with_params()
+        return self.model.objects.raw(
+            f'SELECT * FROM ({sql}) ranked '
+            f'WHERE author_rank <= %s ORDER BY author_rank',
+            (*params, limit)
+        )
+
+
 class Recipe(models.Model):
     """Модель для рецептов."""
     name = models.CharField(
@@ -87,7 +161,21 @@ class Recipe(models.Model):
     image = models.ImageField(
         verbose_name='Картинка', upload_to='image/', null=True, blank=True
     )
-    short_link = models.SlugField(unique=True, blank=True)
+    image_variants = models.JSONField(
+        verbose_name='Уменьшенные копии картинки', null=True, blank=True,
+        editable=False
+    )
+    short_link = models.CharField(
+        verbose_name='Короткая ссылка', max_length=SHORT_LINK_LENGTH,
+        unique=True, null=True, blank=True, editable=False
+    )
+    legacy_short_link = models.SlugField(
+        verbose_name='Старая короткая ссылка',
+        max_length=MAX_LENGTH_LEGACY_SHORT_LINK, unique=True, null=True,
+        blank=True, editable=False, allow_unicode=True
+    )
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         ordering = ('-pub_date',)
@@ -96,11 +184,13 @@ class Recipe(models.Model):
         default_related_name = 'recipe'
 
     def save(self, *args, **kwargs):
-        if not self.short_link:
-            self.short_link = slugify(
-                self.name, allow_unicode=True
-            )[:MAX_LENGTH_SHORT_LINK]
+        """Короткая ссылка вычисляется по первичному ключу после вставки."""
         super().save(*args, **kwargs)
+        if not self.short_link:
+            self.short_link = short_links.encode(self.pk)
+            Recipe.objects.filter(pk=self.pk).update(
+                short_link=self.short_link
+            )
 
     def __str__(self):
         return self.name
@@ -202,3 +292,160 @@ class Favorite(models.Model):
                 fields=['recipe', 'user'], name='unique_favorite_recipe'
             )
         ]
+
+
+def lock_recipes(recipe_ids):
+    """
+    Блокирует строки рецептов в порядке id до конца транзакции.
+
+    Добавление рецепта в корзину и изменение его состава берут эту
+    блокировку до чтения количеств, поэтому изменение состава не
+    пропустит корзину, созданную параллельно. Рецепты блокируются раньше
+    пользователей, чтобы порядок блокировок везде был одинаковым.
+    """
+    list(Recipe.objects.select_for_update().filter(
+        pk__in=recipe_ids
+    ).order_by('pk').values_list('pk', flat=True))
+
+
+def get_recipe_amounts(recipe):
+    """Возвращает количества ингредиентов рецепта по их id."""
+    return dict(
+        IngredientRecipe.objects.filter(recipe=recipe).values_list(
+            'ingredient_id', 'amount'
+        )
+    )
+
+
+def get_recipes_amounts(recipe_ids):
+    """Суммарные количества ингредиентов нескольких рецептов по их id."""
+    return dict(
+        IngredientRecipe.objects.filter(recipe_id__in=recipe_ids).order_by(
+        ).values('ingredient_id').annotate(
+            total=models.Sum('amount')
+        ).values_list('ingredient_id', 'total')
+    )
+
+
+class ShoppingCartItemQuerySet(models.QuerySet):
+    """Поддержка агрегированного списка покупок в актуальном состоянии."""
+
+    def apply_deltas(self, user_ids, deltas):
+        """
+        Изменяет количества ингредиентов у пользователей на deltas.
+
+        Строки, которые уменьшение обнулило бы, удаляются до UPDATE, чтобы
+        количество не стало отрицательным и не нарушило CHECK. Остальные
+        существующие строки обновляются одним UPDATE на ингредиент,
+        недостающие создаются. Вызывающий код держит блокировку строк
+        пользователей (api.bulk.lock_user), иначе параллельные вызовы могут
+        создать одну строку дважды.
+        """
+        deltas = {
+            ingredient_id: delta
+            for ingredient_id, delta in deltas.items() if delta
+        }
+        if not user_ids or not deltas:
+            return
+        for ingredient_id, delta in deltas.items():
+            rows = self.filter(
+                user_id__in=user_ids, ingredient_id=ingredient_id
+            )
+            if delta < 0:
+                rows.filter(amount__lte=-delta).delete()
+            rows.update(amount=models.F('amount') + delta)
+        added = [
+            ingredient_id for ingredient_id, delta in deltas.items()
+            if delta > 0
+        ]
+        existing = set(self.filter(
+            user_id__in=user_ids, ingredient_id__in=added
+        ).values_list('user_id', 'ingredient_id'))
+        self.bulk_create(
+            self.model(
+                user_id=user_id, ingredient_id=ingredient_id,
+                amount=deltas[ingredient_id]
+            )
+            for user_id in user_ids for ingredient_id in added
+            if (user_id, ingredient_id) not in existing
+        )
+
+    def add_recipe(self, user, recipe):
+        self.apply_deltas([user.id], get_recipe_amounts(recipe))
+
+    def remove_recipe(self, user, recipe):
+        self.apply_deltas([user.id], {
+            ingredient_id: -amount
+            for ingredient_id, amount in get_recipe_amounts(recipe).items()
+        })
+
+    def add_recipes(self, user, recipe_ids):
+        self.apply_deltas([user.id], get_recipes_amounts(recipe_ids))
+
+    def remove_recipes(self, user, recipe_ids):
+        self.apply_deltas([user.id], {
+            ingredient_id: -amount for ingredient_id, amount
+            in get_recipes_amounts(recipe_ids).items()
+        })
+
+    def change_recipe(self, recipe, old_amounts, new_amounts):
+        """
+        Переносит изменение состава рецепта во все корзины с ним.
+
+        Вызывающий код блокирует рецепт (lock_recipes) до чтения старого
+        состава. Строки пользователей блокируются в порядке id до
+        изменения их списков, так же как это делает api.bulk.lock_user.
+        """
+        deltas = {
+            ingredient_id: (
+                new_amounts.get(ingredient_id, 0)
+                - old_amounts.get(ingredient_id, 0)
+            )
+            for ingredient_id in old_amounts.keys() | new_amounts.keys()
+        }
+        with transaction.atomic(using=self.db):
+            user_ids = list(
+                User.objects.select_for_update(of=('self',)).filter(
+                    cart__recipe=recipe
+                ).order_by('pk').values_list('pk', flat=True)
+            )
+            self.apply_deltas(user_ids, deltas)
+
+    @staticmethod
+    def calculate():
+        """Считает списки покупок заново по корзинам пользователей."""
+        return {
+            (row['user_id'], row['ingredient_id']): row['total']
+            for row in Cart.objects.order_by().values(
+                'user_id',
+                ingredient_id=models.F('recipe__recipe_ingredient__ingredient')
+            ).annotate(
+                total=models.Sum('recipe__recipe_ingredient__amount')
+            ).filter(ingredient_id__isnull=False)
+        }
+
+
+class ShoppingCartItem(models.Model):
+    """Суммарное количество ингредиента в списке покупок пользователя."""
+    user = models.ForeignKey(
+        verbose_name='Пользователь', to=User, on_delete=models.CASCADE,
+        related_name='shopping_cart_items'
+    )
+    ingredient = models.ForeignKey(
+        verbose_name='Ингредиент', to=Ingredient, on_delete=models.CASCADE,
+        related_name='shopping_cart_items'
+    )
+    amount = models.PositiveIntegerField(verbose_name='Количество')
+
+    objects = ShoppingCartItemQuerySet.as_manager()
+
+    class Meta:
+        ordering = ('ingredient__name',)
+        verbose_name = 'Ингредиент в списке покупок'
+        verbose_name_plural = 'Ингредиенты в списке покупок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='unique_shopping_cart_item'
+            )
+        ]
@@ -0,0 +1,199 @@
+import re
+from array import array
+from threading import Lock
+
+from core.cache import get_version
+from core.constants import INGREDIENTS_VERSION
+from recipes.models import Ingredient
+
+RECIPE_FTS_TABLE = 'recipes_recipe_fts'
+RECIPE_FTS_TRIGGERS = {
+    'recipes_recipe_fts_ai': (
+        "CREATE TRIGGER recipes_recipe_fts_ai AFTER INSERT ON recipes_recipe "
+        "BEGIN INSERT INTO recipes_recipe_fts(rowid, name, text) "
+        "VALUES (new.id, new.name, new.text); END"
+    ),
+    'recipes_recipe_fts_ad': (
+        "CREATE TRIGGER recipes_recipe_fts_ad AFTER DELETE ON recipes_recipe "
+        "BEGIN INSERT INTO recipes_recipe_fts(recipes_recipe_fts, rowid, "
+        "name, text) VALUES ('delete', old.id, old.name, old.text); END"
+    ),
+    'recipes_recipe_fts_au': (
+        "CREATE TRIGGER recipes_recipe_fts_au AFTER UPDATE ON recipes_recipe "
+        "BEGIN INSERT INTO recipes_recipe_fts(recipes_recipe_fts, rowid, "
+        "name, text) VALUES ('delete', old.id, old.name, old.text); "
+        "INSERT INTO recipes_recipe_fts(rowid, name, text) "
+        "VALUES (new.id, new.name, new.text); END"
+    ),
+}
+SEPARATOR = '\x00'
+PREFIX, WORD_START, SUBSTRING = range(3)
+WORD_SEPARATOR = ' '
+
+
+def ensure_recipe_fts_triggers(connection):
+    """
+    Восстанавливает триггеры FTS5 рецептов в SQLite.
+
+    Любое перестроение таблицы recipes_recipe (например, AlterField в
+    миграции) молча удаляет триггеры, и индекс поиска перестаёт
+    обновляться. Недостающие триггеры создаются заново, а индекс
+    перестраивается. Возвращает имена восстановленных триггеров.
+    """
+    if connection.vendor != 'sqlite':
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT type, name FROM sqlite_master "
+            "WHERE type = 'trigger' OR name = %s", (RECIPE_FTS_TABLE,)
+        )
+        existing = {name for _, name in cursor.fetchall()}
+        if RECIPE_FTS_TABLE not in existing:
+            return []
+        missing = sorted(RECIPE_FTS_TRIGGERS.keys() - existing)
+        for name in missing:
+            cursor.execute(RECIPE_FTS_TRIGGERS[name])
+        if missing:
+            cursor.execute(
+                f"INSERT INTO {RECIPE_FTS_TABLE}({RECIPE_FTS_TABLE}) "
+                f"VALUES ('rebuild')"
+            )
+    return missing
+
+
+def normalize(text):
+    """Приводит текст к виду для поиска: регистр, 'ё' и пробелы."""
+    text = text.casefold().replace('ё', 'е')
+    return re.sub(r'\s+', WORD_SEPARATOR, text).strip()
+
+
+def build_suffix_array(text, depth):
+    """
+    Возвращает позиции text, отсортированные по первым depth символам.
+
+    Сортировка удвоением префикса: на каждом шаге позиции упорядочиваются
+    по паре рангов уже отсортированных половин, поэтому в памяти хранятся
+    только массивы чисел, а не сами суффиксы.
+    """
+    size = len(text)
+    positions = list(range(size))
+    ranks = [ord(char) for char in text]
+    length = 1
+    while length < depth:
+        def key(position, length=length):
+            following = position + length
+            return (
+                ranks[position], ranks[following] if following < size else -1
+            )
+        positions.sort(key=key)
+        new_ranks = [0] * size
+        for previous, position in zip(positions, positions[1:]):
+            new_ranks[position] = (
+                new_ranks[previous] + (key(previous) != key(position))
+            )
+        ranks = new_ranks
+        length *= 2
+    if depth <= 1:
+        positions.sort(key=ranks.__getitem__)
+    return array('i', positions)
+
+
+class IngredientIndex:
+    """
+    Суффиксный массив ингредиентов для ранжированного поиска.
+
+    Нормализованные названия склеиваются в одну строку через разделитель,
+    а в массиве хранятся отсортированные позиции начала суффиксов. Запрос
+    находит бинарным поиском диапазон суффиксов, начинающихся с него,
+    поэтому стоимость поиска зависит только от числа совпадений, а память
+    растёт линейно с суммарной длиной названий. Для каждой позиции
+    хранится номер ингредиента, которому она принадлежит. Ранг вхождения —
+    начало названия, начало слова или середина слова — определяется по
+    символу перед позицией. Индекс строится при первом обращении и
+    перестраивается, когда меняется версия справочника ингредиентов.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._version = None
+        self._data = (SEPARATOR, array('i'), array('i'), [], [])
+
+    def _refresh(self):
+        version = get_version(INGREDIENTS_VERSION)
+        if version == self._version:
+            return
+        with self._lock:
+            if version == self._version:
+                return
+            ingredients, keys = [], []
+            for ingredient in Ingredient.objects.all():
+                key = normalize(ingredient.name).replace(SEPARATOR, '')
+                if key:
+                    ingredients.append(ingredient)
+                    keys.append(key)
+            text = SEPARATOR + SEPARATOR.join(keys) + SEPARATOR
+            owners = array('i', [-1])
+            for number, key in enumerate(keys):
+                owners.extend([number] * (len(key) + 1))
+            depth = max(map(len, keys), default=0) + 1
+            suffixes = array('i', (
+                position for position in build_suffix_array(text, depth)
+                if text[position] != SEPARATOR
+            ))
+            # Одно присваивание, чтобы параллельный поиск не увидел
+            # строку и массивы от разных версий.
+            self._data = text, suffixes, owners, keys, ingredients
+            self._version = version
+
+    @staticmethod
+    def _find(text, suffixes, query):
+        """Границы диапазона суффиксов, начинающихся с query."""
+        size = len(query)
+        low, high = 0, len(suffixes)
+        while low < high:
+            middle = (low + high) // 2
+            position = suffixes[middle]
+            if text[position:position + size] < query:
+                low = middle + 1
+            else:
+                high = middle
+        start, high = low, len(suffixes)
+        while low < high:
+            middle = (low + high) // 2
+            position = suffixes[middle]
+            if text[position:position + size] == query:
+                low = middle + 1
+            else:
+                high = middle
+        return start, low
+
+    def search(self, query, limit=None):
+        """
+        Ищет ингредиенты по вхождению query в название.
+
+        Сначала идут совпадения с началом названия, затем с началом одного
+        из слов, затем остальные; внутри группы — по алфавиту.
+        """
+        self._refresh()
+        query = normalize(query)
+        if SEPARATOR in query:
+            return []
+        text, suffixes, owners, keys, ingredients = self._data
+        start, stop = self._find(text, suffixes, query)
+        best = {}
+        for position in suffixes[start:stop]:
+            previous = text[position - 1]
+            if previous == SEPARATOR:
+                rank = PREFIX
+            elif previous == WORD_SEPARATOR:
+                rank = WORD_START
+            else:
+                rank = SUBSTRING
+            number = owners[position]
+            if best.get(number, SUBSTRING + 1) > rank:
+                best[number] = rank
+        found = sorted(best, key=lambda number: (best[number], keys[number]))
+        return [ingredients[number] for number in found[:limit]]
+
+
+ingredient_index = IngredientIndex()
@@ -0,0 +1,108 @@
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_migrate, post_save, pre_delete
+)
+from django.dispatch import receiver
+
+from core.cache import bump_version_on_commit
+from core.constants import (
+    AVATAR_IMAGE_VARIANTS, INGREDIENTS_VERSION, RECIPE_IMAGE_VARIANTS,
+    RECIPE_VERSION, RECIPES_VERSION, TAGS_VERSION, USER_VERSION, USERS_VERSION
+)
+from core.images import schedule_variants
+from recipes.models import (
+    Cart, Favorite, Ingredient, IngredientRecipe, Recipe, ShoppingCartItem,
+    Tag, TagRecipe, get_recipe_amounts, lock_recipes
+)
+from recipes.search import ensure_recipe_fts_triggers
+from users.models import Subscription
+
+User = get_user_model()
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def ingredients_changed(**kwargs):
+    """Инвалидирует индекс ингредиентов при изменении справочника."""
+    bump_version_on_commit(INGREDIENTS_VERSION)
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def tags_changed(**kwargs):
+    """Инвалидирует данные, зависящие от справочника тегов."""
+    bump_version_on_commit(TAGS_VERSION)
+    bump_version_on_commit(RECIPES_VERSION)
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+def recipe_changed(instance, **kwargs):
+    """Инвалидирует данные, зависящие от рецепта."""
+    bump_version_on_commit(RECIPES_VERSION)
+    bump_version_on_commit(RECIPE_VERSION.format(instance.id))
+
+
+@receiver((post_save, post_delete), sender=IngredientRecipe)
+@receiver((post_save, post_delete), sender=TagRecipe)
+def recipe_relation_changed(instance, **kwargs):
+    """Инвалидирует данные рецепта при изменении его тегов и ингредиентов."""
+    bump_version_on_commit(RECIPES_VERSION)
+    bump_version_on_commit(RECIPE_VERSION.format(instance.recipe_id))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def recipe_relations_changed(instance, reverse, pk_set, **kwargs):
+    """То же для массовых изменений через set(), add() и clear()."""
+    bump_version_on_commit(RECIPES_VERSION)
+    recipe_ids = (pk_set or ()) if reverse else (instance.id,)
+    for recipe_id in recipe_ids:
+        bump_version_on_commit(RECIPE_VERSION.format(recipe_id))
+
+
+@receiver((post_save, post_delete), sender=User)
+def user_changed(update_fields=None, **kwargs):
+    """Инвалидирует рецепты, в которых выводятся данные авторов."""
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    bump_version_on_commit(USERS_VERSION)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_image_saved(instance, **kwargs):
+    """Запускает построение копий картинки рецепта."""
+    schedule_variants(instance, 'image', RECIPE_IMAGE_VARIANTS)
+
+
+@receiver(post_save, sender=User)
+def avatar_saved(instance, **kwargs):
+    """Запускает построение копий аватара."""
+    schedule_variants(instance, 'avatar', AVATAR_IMAGE_VARIANTS)
+
+
+@receiver((post_save, post_delete), sender=Cart)
+@receiver((post_save, post_delete), sender=Favorite)
+def user_collection_changed(instance, **kwargs):
+    """Инвалидирует данные, зависящие от избранного и списка покупок."""
+    bump_version_on_commit(USER_VERSION.format(instance.user_id))
+
+
+@receiver((post_save, post_delete), sender=Subscription)
+def subscriptions_changed(instance, **kwargs):
+    """Инвалидирует данные, зависящие от подписок пользователя."""
+    bump_version_on_commit(USER_VERSION.format(instance.subscribe_id))
+
+
+@receiver(pre_delete, sender=Recipe)
+def recipe_deleted(instance, **kwargs):
+    """Убирает удаляемый рецепт из агрегированных списков покупок."""
+    lock_recipes([instance.pk])
+    ShoppingCartItem.objects.change_recipe(
+        instance, get_recipe_amounts(instance), {}
+    )
+
+
+@receiver(post_migrate)
+def recipe_search_migrated(sender, using, **kwargs):
+    """Возвращает триггеры поиска, удалённые перестроением таблицы."""
+    if sender.label == 'recipes':
+        ensure_recipe_fts_triggers(connections[using])
@@ -24,6 +24,10 @@ class User(AbstractUser):
         verbose_name='Аватар', upload_to='image/', null=True, blank=True,
         default=None
     )
+    avatar_variants = models.JSONField(
+        verbose_name='Уменьшенные копии аватара', null=True, blank=True,
+        editable=False
+    )
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['first_name', 'last_name', 'username', ]